@@ -6,33 +6,60 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
+from app.jobs import JobRunner
+from app.metrics import Metrics
+from app.database import RoutingSession, configure_database, init_database
 
 # Initialize Flask extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 bcrypt = Bcrypt()
+jobs = JobRunner()
+metrics = Metrics()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
+    from app.accounts import load_cached_user
+    return load_cached_user(int(user_id))
 
 def create_app(config_class=Config):
     """Create and configure the Flask application"""
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Behind nginx/Apache, take the client address from the proxy headers
+    if app.config['TRUSTED_PROXIES']:
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
     # Initialize extensions with app
+    configure_database(app)
     db.init_app(app)
+    init_database(app)
     login_manager.init_app(app)
     bcrypt.init_app(app)
+    jobs.init_app(app)
+    metrics.init_app(app)
     
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
+    # Set up the password check pool and the logged-in user cache
+    from app.accounts import init_accounts
+    init_accounts(app)
+    
+    # Set up the student lookup cache, rate limits and credential index
+    from app.lookup import init_lookup_cache
+    from app.ratelimit import init_rate_limits
+    from app.credentials import init_credential_index
+    init_lookup_cache(app)
+    init_rate_limits(app)
+    init_credential_index(app)
+    
     # Register blueprints
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -46,4 +73,8 @@ def create_app(config_class=Config):
     from app.results import bp as results_bp
     app.register_blueprint(results_bp, url_prefix='/results')
     
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+    
     return app
\ No newline at end of file
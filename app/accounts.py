@@ -0,0 +1,95 @@
+"""
+Admin authentication helpers: bounded password checks and a user cache
+
+bcrypt is deliberately slow, and during results week many staff sign in at
+once. Checks therefore run on a small dedicated pool (PASSWORD_CHECK_WORKERS)
+so they cannot occupy every CPU, and once PASSWORD_CHECK_QUEUE checks are
+already waiting further logins are turned away at once instead of piling up
+behind them. Hashes made with a BCRYPT_LOG_ROUNDS other than the configured
+one are replaced on the next successful login.
+
+load_user runs on every authenticated request. The user row is kept as a
+detached snapshot for USER_CACHE_TTL seconds and merged into each request's
+session without a SELECT.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from app import db, bcrypt
+from app.cache import TTLCache
+from app.models import User
+
+class PasswordCheckBusy(Exception):
+    """Too many password checks are already queued or running"""
+
+class PasswordChecker:
+    """Thread pool running bcrypt with a cap on checks in flight"""
+
+    def __init__(self, workers, max_pending, timeout):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-checks')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordCheckBusy()
+        try:
+            future = self._pool.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until bcrypt finishes, even if this caller gives up
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordCheckBusy()
+
+def init_accounts(app):
+    app.extensions['password_checker'] = PasswordChecker(
+        app.config['PASSWORD_CHECK_WORKERS'], app.config['PASSWORD_CHECK_QUEUE'],
+        app.config['PASSWORD_CHECK_TIMEOUT'])
+    app.extensions['user_cache'] = TTLCache(maxsize=1000, ttl=app.config['USER_CACHE_TTL'])
+
+def check_password(user, password):
+    """Verify password against user's hash on the password pool.
+
+    Raises PasswordCheckBusy when the pool is saturated.
+    """
+    return current_app.extensions['password_checker'].run(
+        bcrypt.check_password_hash, user.password_hash, password)
+
+def upgrade_password_hash(user, password):
+    """Re-hash password with the configured cost if user's hash uses another one.
+
+    Returns True if the hash was replaced; the caller commits.
+    """
+    if not user.password_needs_rehash():
+        return False
+    password_hash = current_app.extensions['password_checker'].run(
+        bcrypt.generate_password_hash, password)
+    user.password_hash = password_hash.decode('utf-8')
+    forget_user(user.id)
+    return True
+
+def load_cached_user(user_id):
+    """Return the User for user_id, attached to the current session"""
+    cache = current_app.extensions['user_cache']
+    if not cache.ttl:
+        return db.session.get(User, user_id)
+    snapshot = cache.get(user_id)
+    if snapshot is not None:
+        # load=False trusts the snapshot's state rather than re-reading the row
+        return db.session.merge(snapshot, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        cache.set(user_id, snapshot)
+    return user
+
+def forget_user(user_id):
+    """Drop user_id's cached snapshot, e.g. after changing the row"""
+    current_app.extensions['user_cache'].delete(user_id)
@@ -3,37 +3,104 @@ Admin panel routes
 """
 
 import os
+import uuid
 from datetime import datetime
-from flask import render_template, redirect, url_for, flash, request, current_app
+from flask import render_template, redirect, url_for, flash, request, current_app, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import contains_eager, joinedload
 from app.admin import bp
-from app import db
-from app.models import User, Student, Exam, Result, ResultUpload
-from app.forms import ExamForm, StudentForm, ResultUploadForm, ManualResultForm
+from app import db, jobs
+from app.models import User, Student, Exam, Result, ResultUpload, ResultChange, RosterUpload
+from app.forms import (ExamForm, StudentForm, ResultUploadForm, WorkbookUploadForm, RosterUploadForm,
+                       ManualResultForm, PublishExamForm)
+from app.stats import invalidate_exam_statistics
+from app.grading import grade_result, regrade_exam
+from app.transcripts import refresh_transcripts
+from app.lookup import invalidate_students, prerender_exam_results
+from app.pagination import keyset_paginate, cached_count
+from app.exports import iter_export_rows, iter_csv, iter_xlsx
+from app.ratelimit import forget_bad_lookups
+from app.credentials import index_student
+from app.choices import exam_choices, exam_choice_query, exam_label, invalidate_exam_choices
+from app.uploads import queue_upload, record_upload_progress, run_upload, upload_progress_response
+from app.counters import (dashboard_counters, breakdown, count_new_students, count_new_results,
+                          bump_counters, move_exam_results)
+
+# Exam listings and the exam picker page newest year and semester first
+EXAM_LIST_KEYS = [Exam.year, Exam.semester, Exam.id]
+EXAMS_PER_PAGE = 20
 
 @bp.route('/dashboard')
 @login_required
 def dashboard():
     """Admin dashboard"""
-    total_students = Student.query.count()
-    total_exams = Exam.query.count()
-    total_results = Result.query.count()
-    recent_uploads = ResultUpload.query.order_by(ResultUpload.upload_date.desc()).limit(5).all()
+    # Every total and breakdown comes from the counter table in one query
+    counters = dashboard_counters()
+    recent_uploads = ResultUpload.query.options(joinedload(ResultUpload.exam))\
+                                       .order_by(ResultUpload.upload_date.desc()).limit(5).all()
+    
+    students_by_year = breakdown(counters, 'students:year')
+    results_by_year = breakdown(counters, 'results:year')
+    results_by_exam = breakdown(counters, 'results:exam')
+    # Labels come from the cached exam choices, newest exams first
+    exam_breakdown = [(label, results_by_exam[exam_id]) for exam_id, label in exam_choices()
+                      if results_by_exam.get(exam_id)]
     
     return render_template('admin/dashboard.html', title='Admin Dashboard',
-                         total_students=total_students,
-                         total_exams=total_exams,
-                         total_results=total_results,
+                         total_students=counters.get('students', 0),
+                         total_exams=counters.get('exams', 0),
+                         total_results=counters.get('results', 0),
+                         year_breakdown=[(year, students_by_year.get(year, 0), results_by_year.get(year, 0))
+                                         for year in sorted(set(students_by_year) | set(results_by_year))],
+                         exam_breakdown=exam_breakdown,
                          recent_uploads=recent_uploads)
 
+@bp.route('/metrics')
+@login_required
+def metrics():
+    """Request and SQL metrics in Prometheus text format"""
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+def export_response(filters, filename, fmt):
+    """Stream the results matching filters as a CSV or XLSX download"""
+    rows = iter_export_rows(filters, current_app.config['EXPORT_BATCH_SIZE'])
+    body = iter_csv(rows) if fmt == 'csv' else iter_xlsx(rows)
+    return Response(stream_with_context(body), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'})
+
+@bp.route('/export/exam/<int:exam_id>.<any(csv, xlsx):fmt>')
+@login_required
+def export_exam(exam_id, fmt):
+    """Export all results of one exam"""
+    exam = db.get_or_404(Exam, exam_id)
+    filename = secure_filename(f'{exam.name}_{exam.subject}_results') or f'exam_{exam.id}_results'
+    return export_response([Result.exam_id == exam.id], filename, fmt)
+
+@bp.route('/export/year/<int:year>/semester/<int:semester>.<any(csv, xlsx):fmt>')
+@login_required
+def export_semester(year, semester, fmt):
+    """Export all results of every exam in one year/semester"""
+    return export_response([Exam.year == year, Exam.semester == semester],
+                           f'year_{year}_semester_{semester}_results', fmt)
+
 @bp.route('/students')
 @login_required
 def students():
     """List all students"""
-    page = request.args.get('page', 1, type=int)
-    students = Student.query.order_by(Student.roll_number).paginate(
-        page=page, per_page=20, error_out=False)
+    cursor = request.args.get('cursor')
+    students = keyset_paginate(Student.query, [Student.roll_number],
+                               lambda student: (student.roll_number,),
+                               per_page=20, cursor=cursor,
+                               total=cached_count('students', Student.query))
     return render_template('admin/students.html', title='Students', students=students)
 
 @bp.route('/student/add', methods=['GET', 'POST'])
@@ -52,20 +119,81 @@ def add_student():
             section=form.section.data
         )
         db.session.add(student)
+        count_new_students([student.year])
         db.session.commit()
+        forget_bad_lookups(student)
+        index_student(student)
         flash('Student added successfully!', 'success')
         return redirect(url_for('admin.students'))
     
     return render_template('admin/student_form.html', title='Add Student', form=form)
 
+@bp.route('/students/upload', methods=['GET', 'POST'])
+@login_required
+def upload_roster():
+    """Upload a roster of students from file"""
+    form = RosterUploadForm()
+    if form.validate_on_submit():
+        upload_record = queue_upload(RosterUpload, form.file.data, run_roster_upload,
+                                     spool_prefix='roster_', mode=form.mode.data)
+        flash('Roster file queued for processing.', 'info')
+        return redirect(url_for('admin.upload_roster', upload_id=upload_record.id))
+    
+    upload = None
+    upload_id = request.args.get('upload_id', type=int)
+    if upload_id:
+        upload = db.session.get(RosterUpload, upload_id)
+    
+    return render_template('admin/upload_roster.html', title='Upload Roster', form=form, upload=upload)
+
+@bp.route('/students/upload/<int:upload_id>/progress')
+@login_required
+def roster_progress(upload_id):
+    """JSON progress of a queued roster upload"""
+    return upload_progress_response(RosterUpload, upload_id)
+
+def import_roster_upload(upload, source, progress):
+    from app.imports import iter_result_file_chunks
+    from app.roster import ROSTER_DTYPE, import_roster_chunks
+    
+    chunks = iter_result_file_chunks(source, upload.filename, current_app.config['IMPORT_CHUNK_SIZE'],
+                                     dtype=ROSTER_DTYPE)
+    return import_roster_chunks(chunks, progress, update_credentials=upload.mode == 'update')
+
+def run_roster_upload(upload_id, source):
+    """Background job: import an uploaded roster and record the outcome"""
+    run_upload(RosterUpload, upload_id, source, import_roster_upload)
+
 @bp.route('/exams')
 @login_required
 def exams():
     """List all exams"""
-    page = request.args.get('page', 1, type=int)
-    exams = Exam.query.order_by(Exam.year.desc(), Exam.semester.desc()).paginate(
-        page=page, per_page=20, error_out=False)
-    return render_template('admin/exams.html', title='Exams', exams=exams)
+    cursor = request.args.get('cursor')
+    exams = keyset_paginate(Exam.query, EXAM_LIST_KEYS,
+                            lambda exam: (exam.year, exam.semester, exam.id),
+                            per_page=EXAMS_PER_PAGE, cursor=cursor, descending=True,
+                            total=cached_count('exams', Exam.query))
+    return render_template('admin/exams.html', title='Exams', exams=exams,
+                         publish_form=PublishExamForm())
+
+@bp.route('/exams/picker')
+@login_required
+def exam_picker():
+    """Searchable, keyset-paginated exam options for the exam selects, as JSON"""
+    query = exam_choice_query()
+    search = request.args.get('q', '').strip()
+    if search:
+        query = query.filter(db.or_(Exam.name.icontains(search, autoescape=True),
+                                    Exam.subject.icontains(search, autoescape=True)))
+    # exam_choice_query's ordering is replaced by keyset_paginate's
+    page = keyset_paginate(query.order_by(None), EXAM_LIST_KEYS,
+                           lambda row: (row.year, row.semester, row.id),
+                           per_page=20, cursor=request.args.get('cursor'), descending=True)
+    return jsonify({
+        'results': [{'id': row.id, 'text': exam_label(row.name, row.subject, row.year, row.semester)}
+                    for row in page.items],
+        'next_cursor': page.next_cursor
+    })
 
 @bp.route('/exam/add', methods=['GET', 'POST'])
 @login_required
@@ -84,12 +212,87 @@ def add_exam():
             exam_date=form.exam_date.data
         )
         db.session.add(exam)
+        bump_counters({'exams': 1})
         db.session.commit()
+        invalidate_exam_choices()
         flash('Exam added successfully!', 'success')
         return redirect(url_for('admin.exams'))
     
     return render_template('admin/exam_form.html', title='Add Exam', form=form)
 
+@bp.route('/exam/<int:exam_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_exam(exam_id):
+    """Edit an existing exam"""
+    exam = db.get_or_404(Exam, exam_id)
+    form = ExamForm(obj=exam)
+    if form.validate_on_submit():
+        old_year = exam.year
+        form.populate_obj(exam)
+        # Passing/total marks feed every result's grade, the statistics and
+        # every affected student's results
+        db.session.flush()
+        regrade_exam(exam)
+        student_ids = [student_id for (student_id,) in
+                       db.session.query(Result.student_id).filter_by(exam_id=exam.id)]
+        refresh_transcripts(student_ids)
+        invalidate_exam_statistics(exam.id)
+        move_exam_results(exam.id, old_year, exam.year)
+        db.session.commit()
+        invalidate_students(student_ids)
+        invalidate_exam_choices()
+        flash('Exam updated successfully!', 'success')
+        return redirect(url_for('admin.exams'))
+    
+    return render_template('admin/exam_form.html', title='Edit Exam', form=form)
+
+@bp.route('/exam/<int:exam_id>/publish', methods=['POST'])
+@login_required
+def publish_exam(exam_id):
+    """Publish an exam's results and pre-render every affected student's page"""
+    exam = db.get_or_404(Exam, exam_id)
+    form = PublishExamForm()
+    if form.validate_on_submit():
+        exam.result_published_date = datetime.utcnow()
+        db.session.commit()
+        jobs.submit(prerender_exam_results, exam.id)
+        flash(f'Results for {exam.name} published.', 'success')
+    return redirect(url_for('admin.exams'))
+
+@bp.route('/result/add', methods=['GET', 'POST'])
+@login_required
+def add_result():
+    """Manually enter a single result"""
+    form = ManualResultForm()
+    if form.validate_on_submit():
+        roll_number = form.student_roll.data.strip()
+        student = Student.query.filter_by(roll_number=roll_number).first()
+        
+        if not student:
+            flash(f'Student with roll number {roll_number} not found.', 'danger')
+        elif Result.query.filter_by(student_id=student.id, exam_id=form.exam_id.data).first():
+            flash(f'Result already exists for {roll_number}.', 'warning')
+        else:
+            exam = db.session.get(Exam, form.exam_id.data)
+            result = Result(
+                student_id=student.id,
+                exam_id=exam.id,
+                marks_obtained=form.marks_obtained.data,
+                remarks=form.remarks.data or None,
+                uploaded_by=current_user.id,
+                **grade_result(form.marks_obtained.data, form.status.data, exam)
+            )
+            db.session.add(result)
+            count_new_results(exam, 1)
+            refresh_transcripts([student.id])
+            invalidate_exam_statistics(form.exam_id.data)
+            db.session.commit()
+            invalidate_students([student.id])
+            flash('Result saved successfully!', 'success')
+            return redirect(url_for('admin.add_result'))
+    
+    return render_template('admin/result_form.html', title='Enter Result', form=form)
+
 @bp.route('/upload_results', methods=['GET', 'POST'])
 @login_required
 def upload_results():
@@ -97,98 +300,153 @@ def upload_results():
     form = ResultUploadForm()
     if form.validate_on_submit():
         file = form.file.data
-        exam_id = form.exam_id.data
         
         if file:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # Process the uploaded file
-            success_count, error_count, errors = process_result_file(file_path, exam_id, current_user.id)
-            
-            # Record the upload
+            upload_record = queue_upload(ResultUpload, file, run_result_upload,
+                                         exam_id=form.exam_id.data, mode=form.mode.data)
+            flash('Result file queued for processing.', 'info')
+            return redirect(url_for('admin.upload_results', upload_id=upload_record.id))
+    
+    upload = None
+    upload_id = request.args.get('upload_id', type=int)
+    if upload_id:
+        upload = db.session.get(ResultUpload, upload_id)
+    
+    return render_template('admin/upload_results.html', title='Upload Results', form=form, upload=upload)
+
+@bp.route('/upload_workbook', methods=['GET', 'POST'])
+@login_required
+def upload_workbook():
+    """Upload a workbook with one sheet per subject, each sheet going to its own exam"""
+    form = WorkbookUploadForm()
+    if form.validate_on_submit():
+        from app.imports import workbook_sheet_names
+        
+        filename = secure_filename(form.file.data.filename)
+        # Sheets are parsed in other processes, so the workbook always goes to disk
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}")
+        form.file.data.save(file_path)
+        try:
+            sheet_names = workbook_sheet_names(file_path)
+        except Exception as e:
+            os.remove(file_path)
+            flash(f'Could not read workbook: {str(e)}', 'danger')
+            return redirect(url_for('admin.upload_workbook'))
+        
+        # A sheet maps to the exam of this year/semester/type whose subject is the sheet title
+        exams = {}
+        for exam in Exam.query.filter_by(year=form.year.data, semester=form.semester.data,
+                                         exam_type=form.exam_type.data):
+            exams.setdefault(exam.subject.strip().lower(), []).append(exam)
+        
+        sheet_uploads, claimed = {}, set()
+        for sheet_name in sheet_names:
+            matches = exams.get(sheet_name.strip().lower(), [])
+            if len(matches) != 1:
+                flash(f'Sheet "{sheet_name}" skipped: '
+                      f'{"no" if not matches else "more than one"} matching exam.', 'warning')
+                continue
+            if matches[0].id in claimed:
+                flash(f'Sheet "{sheet_name}" skipped: another sheet already maps to {matches[0].name}.', 'warning')
+                continue
+            claimed.add(matches[0].id)
             upload_record = ResultUpload(
-                filename=filename,
-                exam_id=exam_id,
+                filename=f"{filename} [{sheet_name}]"[:255],
+                exam_id=matches[0].id,
                 uploaded_by=current_user.id,
-                total_records=success_count + error_count,
-                successful_records=success_count,
-                failed_records=error_count,
-                status='Completed' if error_count == 0 else 'Completed with errors',
-                error_log='\n'.join(errors) if errors else None
+                total_records=0,
+                successful_records=0,
+                failed_records=0,
+                updated_records=0,
+                mode=form.mode.data,
+                status='Processing'
             )
             db.session.add(upload_record)
-            db.session.commit()
-            
-            flash(f'Results uploaded! {success_count} successful, {error_count} errors.', 
-                  'success' if error_count == 0 else 'warning')
-            
-            # Clean up uploaded file
+            sheet_uploads[sheet_name] = upload_record
+        
+        if not sheet_uploads:
             os.remove(file_path)
-            
-            return redirect(url_for('admin.dashboard'))
+            flash('No sheet in the workbook matched an exam.', 'danger')
+            return redirect(url_for('admin.upload_workbook'))
+        
+        db.session.commit()
+        upload_ids = {sheet_name: upload.id for sheet_name, upload in sheet_uploads.items()}
+        jobs.submit(run_workbook_upload, file_path, upload_ids)
+        
+        flash(f'{len(upload_ids)} sheet(s) queued for processing.', 'info')
+        return redirect(url_for('admin.upload_workbook',
+                                uploads=','.join(str(upload_id) for upload_id in upload_ids.values())))
     
-    return render_template('admin/upload_results.html', title='Upload Results', form=form)
+    uploads = []
+    upload_ids = [int(value) for value in request.args.get('uploads', '').split(',') if value.isdigit()]
+    if upload_ids:
+        uploads = ResultUpload.query.filter(ResultUpload.id.in_(upload_ids))\
+                                    .order_by(ResultUpload.id).all()
+    
+    return render_template('admin/upload_workbook.html', title='Upload Workbook', form=form, uploads=uploads)
+
+@bp.route('/upload/<int:upload_id>/progress')
+@login_required
+def upload_progress(upload_id):
+    """JSON progress of a queued result upload"""
+    return upload_progress_response(ResultUpload, upload_id)
+
+@bp.route('/upload/<int:upload_id>/changes')
+@login_required
+def upload_changes(upload_id):
+    """Corrections applied by an upsert upload"""
+    upload = db.get_or_404(ResultUpload, upload_id)
+    query = upload.changes.join(ResultChange.student).options(contains_eager(ResultChange.student))
+    changes = keyset_paginate(query, [ResultChange.id], lambda change: (change.id,),
+                              per_page=50, cursor=request.args.get('cursor'),
+                              total=upload.updated_records or 0)
+    return render_template('admin/upload_changes.html', title='Upload Corrections',
+                         upload=upload, changes=changes)
 
-def process_result_file(file_path, exam_id, user_id):
-    """Process uploaded result file and return success/error counts"""
+def import_result_upload(upload, source, progress):
+    from app.imports import iter_result_file_chunks, import_result_chunks
+    
+    chunks = iter_result_file_chunks(source, upload.filename, current_app.config['IMPORT_CHUNK_SIZE'])
+    return import_result_chunks(chunks, upload.exam_id, upload.uploaded_by, progress,
+                                upsert=upload.mode == 'upsert', upload_id=upload.id)
+
+def run_result_upload(upload_id, source):
+    """Background job: import an uploaded result file and record the outcome"""
+    run_upload(ResultUpload, upload_id, source, import_result_upload)
+
+def run_workbook_upload(path, sheet_uploads):
+    """Background job: import every mapped sheet of a spooled workbook.
+    
+    sheet_uploads maps sheet names to their ResultUpload ids. Sheets are
+    parsed in parallel (WORKBOOK_PROCESSES), then each is written and
+    committed in one transaction as its parse finishes, so a failing sheet
+    leaves the others untouched. The workbook is removed afterwards.
+    """
+    from app.imports import parse_workbook_sheets, import_result_sheet
+    
+    processes = current_app.config['WORKBOOK_PROCESSES'] or min(4, os.cpu_count() or 1)
     try:
-        # Import pandas only when needed to avoid startup issues
-        import pandas as pd
-        
-        # Read file based on extension
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
-        
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
+        for sheet_name, parsed in parse_workbook_sheets(path, list(sheet_uploads), processes):
+            upload = db.session.get(ResultUpload, sheet_uploads[sheet_name])
             try:
-                # Expected columns: roll_number, marks_obtained, grade, status, remarks
-                roll_number = str(row['roll_number']).strip()
-                marks_obtained = float(row['marks_obtained'])
-                grade = str(row.get('grade', '')).strip()
-                status = str(row.get('status', 'Pass')).strip()
-                remarks = str(row.get('remarks', '')).strip()
-                
-                # Find student
-                student = Student.query.filter_by(roll_number=roll_number).first()
-                if not student:
-                    errors.append(f"Row {index + 1}: Student with roll number {roll_number} not found")
-                    error_count += 1
-                    continue
-                
-                # Check if result already exists
-                existing_result = Result.query.filter_by(student_id=student.id, exam_id=exam_id).first()
-                if existing_result:
-                    errors.append(f"Row {index + 1}: Result already exists for {roll_number}")
-                    error_count += 1
-                    continue
-                
-                # Create new result
-                result = Result(
-                    student_id=student.id,
-                    exam_id=exam_id,
-                    marks_obtained=marks_obtained,
-                    grade=grade if grade else None,
-                    status=status,
-                    remarks=remarks if remarks else None,
-                    uploaded_by=user_id
-                )
-                db.session.add(result)
-                success_count += 1
-                
+                frame, parse_errors = parsed.result()
+                success_count, error_count, errors, updated_count = import_result_sheet(
+                    frame, parse_errors, upload.exam_id, upload.uploaded_by,
+                    upsert=upload.mode == 'upsert', upload_id=upload.id)
+                upload.status = 'Completed' if error_count == 0 else 'Completed with errors'
             except Exception as e:
-                errors.append(f"Row {index + 1}: {str(e)}")
-                error_count += 1
-        
-        db.session.commit()
-        return success_count, error_count, errors
-        
+                db.session.rollback()
+                success_count, updated_count = 0, 0
+                errors = [f"File processing error: {str(e)}"]
+                upload.status = 'Failed'
+            record_upload_progress(upload, success_count, errors, updated_count)
     except Exception as e:
-        return 0, 1, [f"File processing error: {str(e)}"]
\ No newline at end of file
+        # The pool itself broke; fail whichever sheets never got a result
+        db.session.rollback()
+        ResultUpload.query.filter(ResultUpload.id.in_(list(sheet_uploads.values())),
+                                  ResultUpload.status == 'Processing')\
+                          .update({'status': 'Failed', 'error_log': f"File processing error: {str(e)}"},
+                                  synchronize_session=False)
+        db.session.commit()
+    finally:
+        os.remove(path)
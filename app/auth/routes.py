@@ -5,6 +5,8 @@ Authentication routes
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
 from app.auth import bp
+from app import db
+from app.accounts import PasswordCheckBusy, check_password, upgrade_password_hash, forget_user
 from app.forms import LoginForm
 from app.models import User
 
@@ -17,7 +19,14 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and check_password(user, form.password.data)
+            if valid and upgrade_password_hash(user, form.password.data):
+                db.session.commit()
+        except PasswordCheckBusy:
+            flash('Too many sign-ins right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html', title='Admin Login', form=form), 503
+        if valid:
             login_user(user)
             next_page = request.args.get('next')
             flash('Logged in successfully!', 'success')
@@ -29,6 +38,8 @@ def login():
 @bp.route('/logout')
 def logout():
     """Logout admin user"""
+    if current_user.is_authenticated:
+        forget_user(current_user.id)
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('main.index'))
\ No newline at end of file
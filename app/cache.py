@@ -0,0 +1,135 @@
+"""
+Small caches used to keep hot read paths off the database
+
+TTLCache lives inside one worker process. SQLiteCache stores entries in a
+local SQLite file so that every gunicorn worker on the machine sees the same
+entries and the same invalidations. make_cache() picks one based on
+CACHE_DIR.
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteCache:
+    """Cache shared by all worker processes through a local SQLite file.
+
+    Values are pickled. Expired rows are ignored on read and purged
+    opportunistically on write.
+    """
+
+    def __init__(self, path, namespace, ttl=300, purge_probability=0.01):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.purge_probability = purge_probability
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def get(self, key, default=None):
+        row = self._connect().execute('SELECT value, expires FROM cache WHERE key = ?',
+                                      (self._key(key),)).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn = self._connect()
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                     (self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires))
+        if random.random() < self.purge_probability:
+            conn.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+
+    def set_many(self, mapping, ttl=None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        self._connect().executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            [(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+             for key, value in mapping.items()])
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (self._key(key),))
+
+    def delete_many(self, keys):
+        self._connect().executemany('DELETE FROM cache WHERE key = ?',
+                                    [(self._key(key),) for key in keys])
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'",
+                                (self.namespace.replace('_', '\\_') + ':%',))
+
+def make_cache(app, namespace, maxsize, ttl):
+    """Return a shared SQLiteCache when CACHE_DIR is set, else a TTLCache"""
+    cache_dir = app.config.get('CACHE_DIR')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        return SQLiteCache(os.path.join(cache_dir, 'cache.sqlite3'), namespace, ttl=ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,76 @@
+"""
+Cached exam choice lists for the admin forms
+
+The exam selects used to load every Exam as an ORM object each time a form
+was built, POSTs included. The (id, label) pairs are now read once per
+version of the exam list and kept in the shared cache. add_exam and
+edit_exam call invalidate_exam_choices() after committing, which starts a
+new version for every worker. The version is a random token rather than a
+counter, so two workers invalidating at once can never land on the same one.
+
+Selects only render the most recent EXAM_CHOICES_INITIAL exams; older ones
+are found through the exam picker endpoint, which reads the database, so an
+exam missing from a worker's cached list is looked up by primary key before
+a choice is rejected.
+"""
+
+import uuid
+from flask import current_app
+from app import db
+from app.cache import make_cache
+from app.models import Exam
+
+def _cache():
+    cache = current_app.extensions.get('exam_choices')
+    if cache is None:
+        cache = current_app.extensions['exam_choices'] = make_cache(
+            current_app, 'exam_choices', 16, current_app.config['EXAM_CHOICES_TTL'])
+    return cache
+
+def _version(cache):
+    version = cache.get('version')
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set('version', version)
+    return version
+
+def exam_label(name, subject, year, semester):
+    return f"{name} - {subject} (Year {year}, Sem {semester})"
+
+def exam_choice_query():
+    """Columns needed for exam labels, newest year and semester first"""
+    return db.session.query(Exam.id, Exam.name, Exam.subject, Exam.year, Exam.semester)\
+                     .order_by(Exam.year.desc(), Exam.semester.desc(), Exam.id.desc())
+
+def exam_choices():
+    """(id, label) for every exam, newest year and semester first.
+
+    The list is shared between requests, so callers must not modify it.
+    """
+    cache = _cache()
+    key = f'choices:{_version(cache)}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(exam_id, exam_label(name, subject, year, semester))
+                   for exam_id, name, subject, year, semester in exam_choice_query()]
+        cache.set(key, choices)
+    return choices
+
+def exam_choice(exam_id):
+    """(id, label) for exam_id, or None if there is no such exam.
+
+    Without CACHE_DIR another worker's new exam is missing from this worker's
+    list until it expires, so a miss is checked by primary key.
+    """
+    for choice in exam_choices():
+        if choice[0] == exam_id:
+            return choice
+    row = exam_choice_query().filter(Exam.id == exam_id).first()
+    if row is None:
+        return None
+    exam_id, name, subject, year, semester = row
+    return exam_id, exam_label(name, subject, year, semester)
+
+def invalidate_exam_choices():
+    """Start a new version of the exam list; call after the exam change has committed"""
+    _cache().set('version', uuid.uuid4().hex)
@@ -0,0 +1,218 @@
+"""
+Flask CLI commands for database maintenance
+
+    flask upgrade-db        create missing tables, columns and indexes on an existing database
+    flask explain-queries   check that every hot query is served by an index
+    flask credential-index-report
+                            memory footprint of the lookup credential index
+    flask seed              load the demo data, or a synthetic dataset of any size
+"""
+
+import sys
+import time
+import tracemalloc
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateColumn
+from app import db
+from app.models import Student, Exam, StudentTranscript, ExamStatistics
+
+# Indexes earlier versions created that no query uses; they only slow down writes
+OBSOLETE_INDEXES = ('ix_student_roll_id_card', 'ix_student_roll_phone')
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Bring an existing SQLite/PostgreSQL database up to the current schema."""
+    from app.grading import backfill_result_grading
+    from app.transcripts import refresh_transcripts
+    from app.counters import rebuild_counters
+
+    db.create_all()
+    for table, column in add_missing_columns():
+        click.echo(f'Added column {table}.{column}')
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    backfilled = backfill_result_grading()
+    missing = [student_id for (student_id,) in
+               db.session.query(Student.id).outerjoin(StudentTranscript)
+               .filter(StudentTranscript.student_id.is_(None))]
+    refresh_transcripts(missing)
+    # Recounted on every upgrade, which also repairs any drift
+    rebuild_counters()
+    db.session.commit()
+    if backfilled:
+        click.echo(f'Filled percentage and pass/fail for {backfilled} existing results')
+    if missing:
+        click.echo(f'Built transcripts for {len(missing)} students')
+    click.echo('Database schema is up to date.')
+
+def add_missing_columns():
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+
+    Only nullable columns can be added this way; returns (table, column) pairs.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise click.ClickException(f'Cannot add NOT NULL column {table.name}.{column.name}')
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                added.append((table.name, column.name))
+    return added
+
+def hot_queries():
+    """The queries the portal issues most, as (name, statement) pairs.
+
+    Built from the same helpers the routes and imports use, so the check
+    follows the code rather than a copy of it.
+    """
+    from app.admin.routes import EXAM_LIST_KEYS, EXAMS_PER_PAGE
+    from app.imports import roll_number_query, existing_result_query
+    from app.lookup import credential_query
+    from app.pagination import encode_cursor, keyset_query
+    from app.results.routes import EXAM_RESULT_KEYS, EXAM_RESULTS_PER_PAGE, exam_results_query
+    from app.stats import statistics_query, grade_distribution_query
+    from app.transcripts import stored_transcript_query, transcript_result_query
+
+    roll_cursor = encode_cursor('next', ['R0000001'])
+    exam_cursor = encode_cursor('next', [3, 5, 100])
+    return [
+        ('lookup by roll number + ID card', credential_query('R0000001', id_card_number='ID0000001')),
+        ('lookup by roll number + phone', credential_query('R0000001', phone_number='03000000001')),
+        ('stored transcript', stored_transcript_query([1])),
+        ('transcript rebuild', transcript_result_query([1, 2])),
+        ('results by exam, first page',
+         keyset_query(exam_results_query(1), EXAM_RESULT_KEYS, EXAM_RESULTS_PER_PAGE)),
+        ('results by exam, later page',
+         keyset_query(exam_results_query(1), EXAM_RESULT_KEYS, EXAM_RESULTS_PER_PAGE, roll_cursor)),
+        ('stored exam statistics', select(ExamStatistics).where(ExamStatistics.exam_id == 1)),
+        ('exam statistics', statistics_query(1)),
+        ('exam grade distribution', grade_distribution_query(1)),
+        ('exam listing, later page',
+         keyset_query(Exam.query, EXAM_LIST_KEYS, EXAMS_PER_PAGE, exam_cursor, descending=True)),
+        ('import roll number resolution', roll_number_query(['R0000001', 'R0000002'])),
+        ('import duplicate check', existing_result_query(1, [1, 2])),
+    ]
+
+def explain(statement):
+    """Return (plan_lines, uses_full_scan) for statement on the current engine"""
+    engine = db.engine
+    # ORM queries from the helpers are compiled through their Core statement
+    statement = getattr(statement, 'statement', statement)
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+    tables = {'student', 'exam', 'result', 'student_transcript', 'exam_statistics'}
+
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            plan = [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+            # "SCAN student" is a full table scan; "SCAN exam USING INDEX ..." walks an index
+            scans = [line for line in plan
+                     if line.startswith('SCAN ') and 'USING' not in line
+                     and line.split()[1] in tables]
+        else:
+            # Disable sequential scans so tiny tables still show whether an index is usable
+            with conn.begin():
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+                plan = [row[0] for row in conn.execute(text('EXPLAIN ' + sql))]
+            scans = [line for line in plan
+                     if 'Seq Scan on' in line and line.split('Seq Scan on')[1].split()[0] in tables]
+    return plan, bool(scans)
+
+@click.command('explain-queries')
+@with_appcontext
+def explain_queries_command():
+    """EXPLAIN the hot queries and fail if any of them scans a whole table."""
+    failures = 0
+    for name, statement in hot_queries():
+        plan, full_scan = explain(statement)
+        failures += full_scan
+        click.echo(f"{'SCAN' if full_scan else 'ok  '}  {name}")
+        for line in plan:
+            click.echo(f'        {line}')
+    if failures:
+        raise click.ClickException(f'{failures} hot queries fall back to a full table scan')
+
+@click.command('credential-index-report')
+@click.option('--students', default=100000, show_default=True, help='Synthetic students to index')
+def credential_index_report_command(students):
+    """Report the memory footprint and lookup cost of the credential index."""
+    from app.credentials import CredentialIndex
+
+    rows = [(i + 1, f'R{i:07d}', f'ID{i:07d}', f'03{i:09d}') for i in range(students)]
+    index = CredentialIndex()
+    tracemalloc.start()
+    index.build(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    usage = index.memory_usage()
+
+    # The same mapping as a plain dict of int digests, for comparison
+    plain = {digest: student_id for row in rows for digest, student_id in index._pairs(*row)}
+    plain_bytes = sys.getsizeof(plain) + sum(sys.getsizeof(d) + sys.getsizeof(i) for d, i in plain.items())
+
+    probes = [rows[i * 7919 % students] for i in range(min(students, 20000))]
+    started = time.perf_counter()
+    for _, roll_number, id_card_number, _ in probes:
+        index.get(roll_number, id_card_number)
+    per_lookup = (time.perf_counter() - started) / len(probes)
+
+    mib = 1024 * 1024
+    click.echo(f'students:              {students}')
+    click.echo(f'credential pairs:      {len(index)}')
+    click.echo(f'sorted arrays:         {usage["arrays"] / mib:.2f} MiB '
+               f'({usage["arrays"] / len(index):.1f} bytes per pair)')
+    click.echo(f'peak while building:   {peak / mib:.2f} MiB')
+    click.echo(f'equivalent dict:       {plain_bytes / mib:.2f} MiB')
+    click.echo(f'lookup:                {per_lookup * 1e6:.2f} us')
+
+@click.command('seed')
+@click.option('--sample', is_flag=True, help='Load the small demo dataset instead of synthetic data')
+@click.option('--students', default=1000, show_default=True, help='Synthetic students to create')
+@click.option('--exams', default=20, show_default=True, help='Synthetic exams, spread over the five years')
+@click.option('--seed', 'random_seed', default=42, show_default=True,
+              help='Random seed; the same seed and sizes always build the same data')
+@click.option('--batch-size', default=1000, show_default=True, help='Students whose results share one insert')
+@click.option('--no-transcripts', is_flag=True, help='Skip building transcripts (run upgrade-db later)')
+@click.option('--username', default=None, help='Admin username  [default: admin, or benchadmin for synthetic data]')
+@click.option('--password', default=None, help='Admin password  [default: admin123, or benchpass]')
+@with_appcontext
+def seed_command(sample, students, exams, random_seed, batch_size, no_transcripts, username, password):
+    """Fill the database with sample or deterministic synthetic data."""
+    from app.seed import generate_dataset, seed_sample_data
+
+    db.create_all()
+    started = time.perf_counter()
+    if sample:
+        admin = seed_sample_data(username or 'admin', password or 'admin123')
+        db.session.commit()
+        click.echo(f'Sample data loaded in {time.perf_counter() - started:.1f}s')
+    else:
+        if db.session.query(Student.id).first() is not None:
+            raise click.ClickException('The database already has students; '
+                                       'seed synthetic data into an empty database')
+        admin, students, exam_ids, result_count = generate_dataset(
+            students, exams, random_seed, batch_size, username or 'benchadmin', password or 'benchpass',
+            transcripts=not no_transcripts)
+        db.session.commit()
+        click.echo(f'Created {students} students, {len(exam_ids)} exams and {result_count} results '
+                   f'in {time.perf_counter() - started:.1f}s')
+    click.echo(f'Admin login: {admin.username}')
+
+def register_commands(app):
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(explain_queries_command)
+    app.cli.add_command(credential_index_report_command)
+    app.cli.add_command(seed_command)
@@ -0,0 +1,128 @@
+"""
+Running totals for the admin dashboard
+
+COUNT(*) over Result is a sequential scan on PostgreSQL, so the dashboard
+reads maintained counters instead: one row per total in the counter table,
+all fetched with a single SELECT. Counter names are
+
+    students, exams, results
+    students:year:<year>       students enrolled in each year
+    results:year:<year>        results of exams held in each year
+    results:exam:<exam id>     results recorded for each exam
+
+Every path that inserts students, exams or results bumps the counters in the
+same transaction, so the totals commit or roll back with the rows they
+count. Increments are upserts, so concurrent writers never race to create a
+row. rebuild_counters() recounts everything from the tables and overwrites
+the rows with upserts too, so two dashboards building the counters at once
+cannot collide; the dashboard runs it the first time it finds no counters,
+and `flask upgrade-db` runs it as well.
+"""
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Counter, Student, Exam, Result
+
+# Present once the counters have been built from the tables
+BUILT = 'counters:built'
+
+def _upsert_statement(dialect, replace=False):
+    """INSERT that adds to an existing counter, or with replace overwrites it"""
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(Counter)
+        value = statement.inserted.value
+        return statement.on_duplicate_key_update(value=value if replace else Counter.value + value)
+    else:
+        return None
+    statement = dialect_insert(Counter)
+    value = statement.excluded.value
+    return statement.on_conflict_do_update(index_elements=[Counter.name],
+                                           set_={'value': value if replace else Counter.value + value})
+
+def bump_counters(deltas):
+    """Add {name: change} to the counters in the current transaction"""
+    # Sorted so concurrent transactions lock counter rows in the same order
+    rows = [{'name': name, 'value': delta} for name, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    statement = _upsert_statement(db.engine.dialect.name)
+    if statement is not None:
+        db.session.execute(statement, rows)
+        return
+    for row in rows:
+        updated = db.session.query(Counter).filter_by(name=row['name'])\
+                            .update({'value': Counter.value + row['value']}, synchronize_session=False)
+        if not updated:
+            db.session.add(Counter(**row))
+
+def count_new_students(years):
+    """Bump the counters for newly inserted students in the given years"""
+    deltas = {'students': 0}
+    for year in years:
+        deltas['students'] += 1
+        deltas[f'students:year:{year}'] = deltas.get(f'students:year:{year}', 0) + 1
+    bump_counters(deltas)
+
+def count_new_results(exam, count):
+    """Bump the counters for count newly inserted results of exam"""
+    bump_counters({'results': count, f'results:exam:{exam.id}': count,
+                   f'results:year:{exam.year}': count})
+
+def move_exam_results(exam_id, old_year, new_year):
+    """Move an exam's results between the per-year totals after its year changed"""
+    if old_year == new_year:
+        return
+    count = db.session.query(Counter.value).filter_by(name=f'results:exam:{exam_id}').scalar() or 0
+    bump_counters({f'results:year:{old_year}': -count, f'results:year:{new_year}': count})
+
+def rebuild_counters():
+    """Recount every total from the tables in the current transaction; returns them"""
+    totals = {
+        'students': db.session.query(func.count(Student.id)).scalar(),
+        'exams': db.session.query(func.count(Exam.id)).scalar(),
+        'results': 0,
+        BUILT: 1,
+    }
+    for year, count in db.session.query(Student.year, func.count(Student.id)).group_by(Student.year):
+        totals[f'students:year:{year}'] = count
+    for exam_id, year, count in db.session.query(Result.exam_id, Exam.year, func.count(Result.id))\
+                                          .join(Exam, Result.exam_id == Exam.id)\
+                                          .group_by(Result.exam_id, Exam.year):
+        totals['results'] += count
+        totals[f'results:exam:{exam_id}'] = count
+        totals[f'results:year:{year}'] = totals.get(f'results:year:{year}', 0) + count
+    rows = [{'name': name, 'value': value} for name, value in sorted(totals.items())]
+    statement = _upsert_statement(db.engine.dialect.name, replace=True)
+    if statement is None:
+        db.session.query(Counter).delete(synchronize_session=False)
+        db.session.execute(insert(Counter), rows)
+        return totals
+    stale = [name for name, in db.session.query(Counter.name) if name not in totals]
+    if stale:
+        db.session.query(Counter).filter(Counter.name.in_(stale)).delete(synchronize_session=False)
+    db.session.execute(statement, rows)
+    return totals
+
+def dashboard_counters():
+    """Every counter as {name: value}, building them first if needed"""
+    counters = dict(db.session.query(Counter.name, Counter.value))
+    if BUILT not in counters:
+        try:
+            counters = rebuild_counters()
+            db.session.commit()
+        except IntegrityError:
+            # Another request built them first (only without a dialect upsert)
+            db.session.rollback()
+            counters = dict(db.session.query(Counter.name, Counter.value))
+    return counters
+
+def breakdown(counters, prefix):
+    """{key: value} for the counters named prefix:<key>, with integer keys"""
+    return {int(name[len(prefix) + 1:]): value for name, value in counters.items()
+            if name.startswith(prefix + ':')}
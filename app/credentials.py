@@ -0,0 +1,214 @@
+"""
+In-memory credential index for the student lookup
+
+Every student is indexed twice: under a digest of roll number + ID card
+number and under one of roll number + phone number, each mapping to the
+student id. A lookup that hits the index is authenticated without a database
+round trip; a miss falls back to the SQL query (students added by another
+worker are found that way and indexed), so the index only ever saves work.
+
+Digests are 8-byte keyed BLAKE2b values, with a random key per process so
+they are useless outside it. The bulk of the index is two parallel sorted
+arrays (12 bytes per credential pair); changes since the last build go into
+a small dict overlay that is folded back in once it grows.
+
+The index is first built on a thread of its own when the app starts, and
+each worker rebuilds it every CREDENTIAL_INDEX_REFRESH seconds, which bounds
+how long a credential changed by another worker keeps working there; a failed
+build is retried after RETRY_AFTER seconds. Nothing waits for a build: lookups
+keep using the old arrays (or, before the first build, the SQL query), and
+credential changes made meanwhile are replayed once the new arrays are in.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from app import db
+from app.models import Student
+
+RETRY_AFTER = 30  # seconds before a failed build is tried again
+
+class CredentialIndex:
+    """Credential-pair digest -> student id"""
+
+    def __init__(self, compact_after=4096):
+        self.compact_after = compact_after
+        self.built_at = None
+        self.refresh_started_at = None
+        self.build_failed = False
+        self._key = os.urandom(16)
+        # (digests, ids) swapped as one tuple so readers never see a half-built pair
+        self._base = (array('Q'), array('I'))
+        # Changes since the last build; an id of 0 marks a removed pair
+        self._overlay = {}
+        # Changes made while a build reads its snapshot, replayed over the new arrays
+        self._pending = None
+        self._lock = threading.Lock()
+        self.build_lock = threading.Lock()
+
+    def digest(self, roll_number, id_card_number=None, phone_number=None):
+        if id_card_number:
+            material = f'{roll_number}\0id\0{id_card_number}'
+        else:
+            material = f'{roll_number}\0phone\0{phone_number}'
+        return int.from_bytes(hashlib.blake2b(material.encode(), digest_size=8, key=self._key).digest(), 'little')
+
+    def _pairs(self, student_id, roll_number, id_card_number, phone_number):
+        return [(self.digest(roll_number, id_card_number=id_card_number), student_id),
+                (self.digest(roll_number, phone_number=phone_number), student_id)]
+
+    def build(self, rows):
+        """Replace the contents with (id, roll_number, id_card_number, phone_number) rows.
+
+        Changes recorded after the build began are kept: the rows may have
+        been read before they were made.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            pairs = sorted(pair for row in rows for pair in self._pairs(*row))
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        base = (array('Q', [d for d, _ in pairs]), array('I', [i for _, i in pairs]))
+        with self._lock:
+            self._base = base
+            self._overlay = dict(self._pending)
+            self._pending = None
+            self.built_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        """True when no build has been started, the last one failed over RETRY_AFTER
+        seconds ago, or it started over max_age seconds ago"""
+        started = self.refresh_started_at
+        if started is None:
+            return True
+        age = time.monotonic() - started
+        if self.build_failed:
+            return age > RETRY_AFTER
+        return bool(max_age) and age > max_age
+
+    def add(self, student_id, roll_number, id_card_number, phone_number):
+        self._record(self._pairs(student_id, roll_number, id_card_number, phone_number))
+
+    def remove(self, roll_number, id_card_number, phone_number):
+        self._record(self._pairs(0, roll_number, id_card_number, phone_number))
+
+    def _record(self, pairs):
+        with self._lock:
+            for digest, value in pairs:
+                self._overlay[digest] = value
+            if self._pending is not None:
+                self._pending.extend(pairs)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._overlay) < self.compact_after:
+            return
+        digests, ids = self._base
+        merged = dict(zip(digests, ids))
+        merged.update(self._overlay)
+        pairs = sorted((d, i) for d, i in merged.items() if i)
+        self._base = (array('Q', [d for d, _ in pairs]), array('I', [i for _, i in pairs]))
+        self._overlay = {}
+
+    def get(self, roll_number, id_card_number=None, phone_number=None):
+        """Student id for these credentials, or None if they are not indexed"""
+        digest = self.digest(roll_number, id_card_number, phone_number)
+        student_id = self._overlay.get(digest)
+        if student_id is None:
+            digests, ids = self._base
+            position = bisect_left(digests, digest)
+            if position < len(digests) and digests[position] == digest:
+                student_id = ids[position]
+        return student_id or None
+
+    def __len__(self):
+        return len(self._base[0])
+
+    def memory_usage(self):
+        """Approximate bytes held, split into the sorted arrays and the overlay"""
+        digests, ids = self._base
+        overlay = sys.getsizeof(self._overlay) + sum(
+            sys.getsizeof(d) + sys.getsizeof(i) for d, i in self._overlay.items())
+        return {'arrays': sys.getsizeof(digests) + sys.getsizeof(ids), 'overlay': overlay}
+
+def init_credential_index(app):
+    if app.config['CREDENTIAL_INDEX_ENABLED']:
+        index = app.extensions['credential_index'] = CredentialIndex()
+        with app.app_context():
+            refresh_credential_index(index)
+
+def _rebuild(app, index):
+    """Read every student's credentials and swap in a new index"""
+    try:
+        with app.app_context():
+            rows = db.session.query(Student.id, Student.roll_number, Student.id_card_number,
+                                    Student.phone_number).yield_per(5000)
+            index.build(rows)
+        index.build_failed = False
+    except Exception:
+        index.build_failed = True
+        app.logger.exception('Building the credential index failed; retrying in %s seconds', RETRY_AFTER)
+    finally:
+        index.build_lock.release()
+
+def refresh_credential_index(index):
+    """Start a rebuild unless one is already running.
+
+    It runs on a thread of its own rather than the job runner, so it never
+    queues behind uploads (with JOBS_RUN_INLINE it runs in the caller).
+    """
+    # Released by _rebuild once the new arrays are in place
+    if not index.build_lock.acquire(blocking=False):
+        return
+    index.refresh_started_at = time.monotonic()
+    app = current_app._get_current_object()
+    if app.config['JOBS_RUN_INLINE']:
+        _rebuild(app, index)
+        return
+    try:
+        threading.Thread(target=_rebuild, args=(app, index), name='credential-index', daemon=True).start()
+    except BaseException:
+        index.build_lock.release()
+        raise
+
+def _current_index():
+    index = current_app.extensions.get('credential_index')
+    if index is None:
+        return None
+    if index.is_stale(current_app.config['CREDENTIAL_INDEX_REFRESH']):
+        refresh_credential_index(index)
+    return index
+
+def indexed_student_id(roll_number, id_card_number, phone_number):
+    """Student id from the index, or None when it is disabled or has no entry"""
+    index = _current_index()
+    if index is None:
+        return None
+    return index.get(roll_number, id_card_number, phone_number)
+
+def index_student(student, previous=None):
+    """Record student's current credentials; previous is the old (roll, id card, phone)"""
+    index_students([(student.id, student.roll_number, student.id_card_number, student.phone_number)],
+                   [previous] if previous is not None else ())
+
+def index_students(rows, previous=()):
+    """Batch form of index_student for (id, roll, id card, phone) rows.
+
+    previous holds the (roll, id card, phone) triples the rows replace.
+    """
+    index = current_app.extensions.get('credential_index')
+    if index is None:
+        return
+    # Never waits for a rebuild: one in progress replays these over its snapshot
+    for credentials in previous:
+        index.remove(*credentials)
+    for student_id, roll_number, id_card_number, phone_number in rows:
+        index.add(student_id, roll_number, id_card_number, phone_number)
@@ -0,0 +1,141 @@
+"""
+Database engine tuning and read-replica routing
+
+Engine options are derived from config before Flask-SQLAlchemy creates its
+engines: server databases get a sized, recycled, pre-pinged connection pool,
+and SQLite files get WAL journaling plus synchronous/busy_timeout/mmap pragmas
+on every new connection so readers keep going while an import commits.
+
+When DATABASE_REPLICA_URL is set it becomes the 'replica' bind, and plain
+SELECTs issued while serving the read-only public blueprints
+(DATABASE_REPLICA_BLUEPRINTS) are sent there. Without a replica, a SQLite
+file database gets a 'replica' bind of its own: the same file opened with
+mode=ro in a separate pool, so student lookups never queue behind an import
+for a connection and can never write. Flushes, UPDATE/DELETE statements,
+background jobs and every other blueprint stay on the primary.
+
+A request that writes marks the user's session so their reads go to the
+primary for DATABASE_READ_YOUR_WRITES_SECONDS afterwards; an admin who has
+just uploaded results then sees them on the public pages despite replica lag.
+"""
+
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def engine_options(uri, config):
+    """Pool options suited to the database behind uri"""
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+        'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+    }
+
+def read_only_sqlite_url(uri):
+    """The same SQLite file opened read-only, or None for other databases"""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    if url.query.get('uri'):
+        return url.update_query_dict({'mode': 'ro'})
+    return url.set(database=f'file:{url.database}').update_query_dict({'mode': 'ro', 'uri': 'true'})
+
+def configure_database(app):
+    """Fill in engine options and the replica bind; call before db.init_app"""
+    config = app.config
+    options = engine_options(config['SQLALCHEMY_DATABASE_URI'], config)
+    # Anything set explicitly in SQLALCHEMY_ENGINE_OPTIONS wins
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if not replica_url and config['SQLITE_READ_ONLY_BIND']:
+        replica_url = read_only_sqlite_url(config['SQLALCHEMY_DATABASE_URI'])
+    if replica_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds['replica'] = {'url': replica_url, **engine_options(replica_url, config)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+def _sqlite_pragmas(config, read_only=False):
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {", ".join(SQLITE_SYNCHRONOUS_MODES)}')
+    pragmas = [f'PRAGMA synchronous={synchronous}',
+               f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+               f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}']
+    # The journal mode is a property of the file, set by the writable connections
+    if config['SQLITE_WAL'] and not read_only:
+        pragmas.insert(0, 'PRAGMA journal_mode=WAL')
+    return pragmas
+
+def init_database(app):
+    """Install SQLite pragmas and replica routing; call after db.init_app"""
+    from app import db
+
+    def pragma_hook(pragmas):
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+        return set_pragmas
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                read_only = engine.url.query.get('mode') == 'ro'
+                event.listen(engine, 'connect', pragma_hook(_sqlite_pragmas(app.config, read_only)))
+
+    replica_blueprints = set(app.config['DATABASE_REPLICA_BLUEPRINTS'])
+
+    @app.before_request
+    def choose_read_engine():
+        g.db_use_replica = (request.blueprint in replica_blueprints
+                            and session.get('db_primary_until', 0) < time.time())
+
+    @app.after_request
+    def remember_write(response):
+        # Public pages only write derived data (cached statistics), not the user's own changes
+        if g.pop('db_wrote', False) and request.blueprint not in replica_blueprints:
+            stick_to_primary()
+        return response
+
+def stick_to_primary():
+    """Read this user's requests from the primary for DATABASE_READ_YOUR_WRITES_SECONDS"""
+    window = current_app.config['DATABASE_READ_YOUR_WRITES_SECONDS']
+    if window:
+        session['db_primary_until'] = time.time() + window
+
+@contextmanager
+def use_primary():
+    """Send reads in this block to the primary even on a replica-routed request"""
+    previous = g.get('db_use_replica', False) if has_request_context() else False
+    if has_request_context():
+        g.db_use_replica = False
+    try:
+        yield
+    finally:
+        if has_request_context():
+            g.db_use_replica = previous
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the replica bind when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or not isinstance(clause, Select):
+                g.db_wrote = True
+            elif g.get('db_use_replica', False):
+                replica = self._db.engines.get('replica')
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,65 @@
+"""
+Streaming CSV/XLSX export of results
+
+Rows are pulled from the database in server-side batches (yield_per) as
+plain column tuples joined to Student and Exam, so exporting a whole cohort
+keeps memory flat. CSV is written straight into the response as it is
+generated; XLSX uses openpyxl's write-only mode and is streamed out of a
+temporary file once the workbook is complete.
+"""
+
+import csv
+import io
+import tempfile
+from app import db
+from app.models import Student, Exam, Result
+
+EXPORT_HEADER = ['roll_number', 'name', 'student_year', 'section', 'exam', 'subject',
+                 'exam_year', 'semester', 'marks_obtained', 'total_marks', 'grade',
+                 'status', 'remarks']
+
+def iter_export_rows(filters, batch_size):
+    """Yield one tuple per result matching filters, in EXPORT_HEADER order"""
+    query = db.session.query(
+        Student.roll_number, Student.name, Student.year, Student.section,
+        Exam.name, Exam.subject, Exam.year, Exam.semester,
+        Result.marks_obtained, Exam.total_marks, Result.grade,
+        Result.status, Result.remarks
+    ).join(Student, Result.student_id == Student.id)\
+     .join(Exam, Result.exam_id == Exam.id)\
+     .filter(*filters)\
+     .order_by(Exam.id, Student.roll_number)\
+     .yield_per(batch_size)
+    yield from query
+
+def iter_csv(rows, flush_size=64 * 1024):
+    """Encode rows as CSV, yielding roughly flush_size bytes at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= flush_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_xlsx(rows, chunk_size=64 * 1024):
+    """Build a write-only workbook from rows and stream the finished file"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Results')
+    sheet.append(EXPORT_HEADER)
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
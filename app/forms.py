@@ -2,11 +2,38 @@
 Forms for University Result Portal
 """
 
+from flask import current_app, url_for
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, SubmitField, IntegerField, FloatField, SelectField, TextAreaField, DateField
-from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional
+from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional, ValidationError
 from app.models import Student, Exam
+from app.choices import exam_choices, exam_choice
+
+class ExamSelectField(SelectField):
+    """Exam select fed from the cached exam choices.
+
+    Only the newest EXAM_CHOICES_INITIAL exams (plus the selected one) are
+    rendered; the picker can submit any other exam, so validation checks the
+    full list.
+    """
+    def __init__(self, label=None, validators=None, **kwargs):
+        super().__init__(label, validators, coerce=int, **kwargs)
+    
+    def load_choices(self):
+        choices = exam_choices()
+        shown = choices[:current_app.config['EXAM_CHOICES_INITIAL']]
+        if self.data is not None and all(exam_id != self.data for exam_id, _ in shown):
+            selected = exam_choice(self.data)
+            if selected is not None:
+                shown = shown + [selected]
+        self.choices = shown
+        # script.js adds a search box that pages through the picker endpoint
+        self.render_kw = dict(self.render_kw or {}, **{'data-exam-picker': url_for('admin.exam_picker')})
+    
+    def pre_validate(self, form):
+        if self.data is None or exam_choice(self.data) is None:
+            raise ValidationError(self.gettext('Not a valid choice.'))
 
 class LoginForm(FlaskForm):
     """Admin login form"""
@@ -65,7 +92,11 @@ class StudentForm(FlaskForm):
 
 class ResultUploadForm(FlaskForm):
     """Form for uploading result files"""
-    exam_id = SelectField('Select Exam', coerce=int, validators=[DataRequired()])
+    exam_id = ExamSelectField('Select Exam', validators=[DataRequired()])
+    mode = SelectField('Mode',
+                      choices=[('insert', 'Add new results only'),
+                               ('upsert', 'Add new results and correct existing ones')],
+                      default='insert')
     file = FileField('Result File', validators=[
         FileRequired(),
         FileAllowed(['csv', 'xlsx', 'xls'], 'Only CSV and Excel files are allowed!')
@@ -74,25 +105,53 @@ class ResultUploadForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.exam_id.choices = [(exam.id, f"{exam.name} - {exam.subject} (Year {exam.year}, Sem {exam.semester})") 
-                               for exam in Exam.query.order_by(Exam.year.desc(), Exam.semester.desc()).all()]
+        self.exam_id.load_choices()
+
+class WorkbookUploadForm(FlaskForm):
+    """Form for uploading a workbook with one sheet per subject"""
+    exam_type = SelectField('Exam Type',
+                          choices=[('mid-term', 'Mid-term'), ('final', 'Final'), ('sessional', 'Sessional'), ('practical', 'Practical')],
+                          validators=[DataRequired()])
+    year = IntegerField('Academic Year', validators=[DataRequired(), NumberRange(min=1, max=5)])
+    semester = IntegerField('Semester', validators=[DataRequired(), NumberRange(min=1, max=10)])
+    mode = SelectField('Mode',
+                      choices=[('insert', 'Add new results only'),
+                               ('upsert', 'Add new results and correct existing ones')],
+                      default='insert')
+    file = FileField('Workbook', validators=[
+        FileRequired(),
+        FileAllowed(['xlsx'], 'Only Excel (.xlsx) workbooks are allowed!')
+    ])
+    submit = SubmitField('Upload Workbook')
+
+class RosterUploadForm(FlaskForm):
+    """Form for uploading a student roster"""
+    mode = SelectField('Mode',
+                      choices=[('insert', 'Add new students only'),
+                               ('update', 'Add new students and update ID card/phone of existing ones')],
+                      default='insert')
+    file = FileField('Roster File', validators=[
+        FileRequired(),
+        FileAllowed(['csv', 'xlsx', 'xls'], 'Only CSV and Excel files are allowed!')
+    ])
+    submit = SubmitField('Upload Roster')
+
+class PublishExamForm(FlaskForm):
+    """Confirmation form for publishing an exam's results"""
+    submit = SubmitField('Publish')
 
 class ManualResultForm(FlaskForm):
     """Form for manually entering individual results"""
     student_roll = StringField('Student Roll Number', validators=[DataRequired()])
-    exam_id = SelectField('Select Exam', coerce=int, validators=[DataRequired()])
+    exam_id = ExamSelectField('Select Exam', validators=[DataRequired()])
     marks_obtained = FloatField('Marks Obtained', validators=[DataRequired(), NumberRange(min=0)])
-    grade = SelectField('Grade', 
-                       choices=[('A+', 'A+'), ('A', 'A'), ('B+', 'B+'), ('B', 'B'), 
-                               ('C+', 'C+'), ('C', 'C'), ('D', 'D'), ('F', 'F')],
-                       validators=[Optional()])
-    status = SelectField('Status',
-                        choices=[('Pass', 'Pass'), ('Fail', 'Fail'), ('Absent', 'Absent')],
+    # Grade and Pass/Fail are calculated from the marks
+    status = SelectField('Attendance',
+                        choices=[('Present', 'Present'), ('Absent', 'Absent')],
                         validators=[DataRequired()])
     remarks = TextAreaField('Remarks', validators=[Optional()])
     submit = SubmitField('Save Result')
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.exam_id.choices = [(exam.id, f"{exam.name} - {exam.subject}") 
-                               for exam in Exam.query.order_by(Exam.created_at.desc()).all()]
\ No newline at end of file
+        self.exam_id.load_choices()
\ No newline at end of file
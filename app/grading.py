@@ -0,0 +1,112 @@
+"""
+Grading engine
+
+Percentage, pass/fail, status and letter grade are derived from the marks,
+the exam's total/passing marks and GRADE_BOUNDARIES, and stored on Result so
+pages and statistics read them instead of recomputing per row. The sheet's
+status column only decides whether a student was Absent.
+
+GRADE_BOUNDARIES lists (minimum percentage, grade) from best to worst; the
+last entry is the failing grade. A result below passing_marks always gets the
+failing grade, and a passing result gets the best grade whose minimum it
+reaches (never lower than the lowest passing grade). Absent results have no
+grade; a status counts as Absent when it reads "absent" in any case once
+surrounding spaces are trimmed, in grade_frame() and regrade_exam() alike.
+
+grade_frame() grades a whole DataFrame at once during imports; regrade_exam()
+does the same in a single UPDATE when an exam's marks scheme changes.
+"""
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import and_, case, func, literal, not_, null, select, update
+from app import db
+from app.models import Result, Exam
+
+def grade_boundaries():
+    """Configured boundaries as [(minimum, grade)], best grade first"""
+    boundaries = sorted(((float(minimum), grade) for minimum, grade in current_app.config['GRADE_BOUNDARIES']),
+                        key=lambda boundary: boundary[0], reverse=True)
+    if len(boundaries) < 2:
+        raise ValueError('GRADE_BOUNDARIES needs at least one passing grade and a failing grade')
+    return boundaries
+
+def grade_frame(frame, total_marks, passing_marks):
+    """Return frame with percentage, passed, status and grade filled in.
+
+    frame needs marks_obtained and status columns.
+    """
+    boundaries = grade_boundaries()
+    passing, (_, failing_grade) = boundaries[:-1], boundaries[-1]
+
+    marks = frame['marks_obtained'].astype(float)
+    if total_marks > 0:
+        percentage = marks / total_marks * 100
+    else:
+        percentage = pd.Series(0.0, index=frame.index)
+    # Spaces only, as SQL TRIM strips them in regrade_exam
+    absent = frame['status'].astype(str).str.strip(' ').str.lower() == 'absent'
+    passed = ~absent & (marks >= passing_marks)
+
+    grade = np.select([percentage >= minimum for minimum, _ in passing],
+                      [grade for _, grade in passing], default=passing[-1][1]).astype(object)
+    grade[~passed.to_numpy()] = failing_grade
+    grade[absent.to_numpy()] = None
+    status = np.where(absent, 'Absent', np.where(passed, 'Pass', 'Fail'))
+
+    return frame.assign(percentage=percentage, passed=passed, status=status, grade=grade)
+
+def grade_result(marks_obtained, status, exam):
+    """Derived columns for a single result, as a dict"""
+    frame = pd.DataFrame({'marks_obtained': [marks_obtained], 'status': [status]})
+    row = grade_frame(frame, exam.total_marks, exam.passing_marks).iloc[0]
+    return {
+        'percentage': float(row.percentage),
+        'passed': bool(row.passed),
+        'status': row.status,
+        'grade': row.grade,
+    }
+
+def regrade_exam(exam):
+    """Recompute the derived columns of every result for exam in one UPDATE"""
+    boundaries = grade_boundaries()
+    passing, (_, failing_grade) = boundaries[:-1], boundaries[-1]
+
+    if exam.total_marks > 0:
+        percentage = Result.marks_obtained * 100.0 / exam.total_marks
+    else:
+        percentage = literal(0.0)
+    absent = func.lower(func.trim(Result.status)) == 'absent'
+    passed = and_(not_(absent), Result.marks_obtained >= exam.passing_marks)
+
+    db.session.execute(
+        update(Result).where(Result.exam_id == exam.id).values(
+            percentage=percentage,
+            passed=passed,
+            status=case((absent, 'Absent'), (passed, 'Pass'), else_='Fail'),
+            grade=case((absent, null()), (not_(passed), failing_grade),
+                       *[(percentage >= minimum, grade) for minimum, grade in passing],
+                       else_=passing[-1][1]),
+        ),
+        execution_options={'synchronize_session': False}
+    )
+
+def backfill_result_grading():
+    """Fill percentage/passed on results stored before they were columns.
+
+    Uses the rules those rows were shown with (status 'Pass' and marks at or
+    above passing_marks) and leaves their grade and status untouched.
+    Returns the number of rows updated.
+    """
+    exam = select(Exam).where(Exam.id == Result.exam_id)
+    total_marks = exam.with_only_columns(Exam.total_marks).scalar_subquery()
+    passing_marks = exam.with_only_columns(Exam.passing_marks).scalar_subquery()
+    result = db.session.execute(
+        update(Result).where(Result.percentage.is_(None)).values(
+            percentage=case((total_marks > 0, Result.marks_obtained * 100.0 / total_marks), else_=0.0),
+            passed=and_(func.lower(Result.status) == 'pass', Result.marks_obtained >= passing_marks),
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
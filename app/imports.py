@@ -0,0 +1,333 @@
+"""
+Set-based import engine for result sheets
+
+Rows are handled a chunk at a time: every roll number in a chunk is resolved
+with one query, existing results are found with one query against the
+(student_id, exam_id) unique constraint, and new results are written with a
+single bulk insert. The number of round trips therefore grows with the number
+of chunks rather than the number of rows. Percentage, pass/fail, status and
+grade are computed for the whole chunk by the grading engine before insert.
+
+Workbooks with a sheet per exam are parsed and validated in a process pool,
+then each sheet is written and committed in a single transaction.
+
+In upsert mode (corrected sheets) rows for existing results are diffed
+against the stored values in the same pass, and only rows that actually
+changed are written, with one bulk UPDATE and a ResultChange log entry each.
+"""
+
+import pandas as pd
+from sqlalchemy import insert, update
+from app import db
+from app.models import Student, Exam, Result, ResultChange
+from app.grading import grade_frame
+from app.stats import invalidate_exam_statistics
+from app.lookup import invalidate_students
+from app.transcripts import refresh_transcripts
+from app.counters import count_new_results
+
+REQUIRED_COLUMNS = ('roll_number', 'marks_obtained')
+
+def iter_frame_chunks(df, chunk_size):
+    """Split an in-memory DataFrame into chunks, keeping the original index"""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def _iter_xlsx_chunks(source, chunk_size, sheet_name=None):
+    """Stream a worksheet (the first by default) through openpyxl's read-only row iterator"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else f'Unnamed: {position}'
+                   for position, name in enumerate(header)]
+
+        batch, index = [], []
+        for position, row in enumerate(rows):
+            # Blank rows are skipped but still counted, so row numbers in
+            # error messages match what the admin sees in the sheet
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(columns)])
+            index.append(position)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=columns, index=index)
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns, index=index)
+    finally:
+        workbook.close()
+
+def iter_result_file_chunks(source, filename, chunk_size, dtype=None):
+    """Yield DataFrame chunks from an uploaded CSV/XLSX file.
+
+    source may be a path or a binary file object such as the upload stream.
+    CSV and XLSX are read incrementally so peak memory stays at roughly one
+    chunk regardless of file size. dtype applies to CSV and XLS columns and
+    defaults to reading roll numbers as strings.
+    """
+    if dtype is None:
+        # Roll numbers stay strings so blank cells cannot turn them into floats
+        dtype = {'roll_number': str}
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        yield from pd.read_csv(source, dtype=dtype, chunksize=chunk_size)
+    elif extension == 'xlsx':
+        yield from _iter_xlsx_chunks(source, chunk_size)
+    else:
+        # Legacy .xls has no streaming reader, so it is loaded whole
+        df = pd.read_excel(source, dtype=dtype)
+        yield from iter_frame_chunks(df, chunk_size)
+
+def _text_column(df, name, default):
+    """Return a stripped string column, using default for missing or empty cells"""
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[name].fillna('').astype(str).str.strip()
+    return values.mask(values == '', default)
+
+def _marks_error(value):
+    """Reproduce the message float() gives for an unparseable marks cell"""
+    if isinstance(value, str):
+        return f"could not convert string to float: {value!r}"
+    if value is None or pd.isna(value):
+        return "marks_obtained is missing"
+    return f"float() argument must be a string or a real number, not {type(value).__name__!r}"
+
+def prepare_result_frame(df):
+    """Validate and normalise a chunk of an uploaded result sheet.
+
+    Returns a frame holding only the rows that parsed cleanly, together with
+    a list of (index, message) pairs for the rows that did not.
+    """
+    for column in REQUIRED_COLUMNS:
+        if column not in df.columns:
+            # Matches the KeyError message the row-by-row importer reported
+            return df.iloc[0:0], [(index, repr(column)) for index in df.index]
+
+    raw_marks = df['marks_obtained'].map(lambda v: v.strip() if isinstance(v, str) else v)
+    marks = pd.to_numeric(raw_marks, errors='coerce')
+    invalid = marks.isna()
+    errors = [(index, _marks_error(df.at[index, 'marks_obtained']))
+              for index in df.index[invalid]]
+
+    frame = pd.DataFrame({
+        'roll_number': df['roll_number'].astype(str).str.strip(),
+        'marks_obtained': marks,
+        # Only "Absent" is taken from the sheet; everything else is graded from the marks
+        'status': _text_column(df, 'status', ''),
+        'remarks': _text_column(df, 'remarks', ''),
+    }, index=df.index)
+    return frame[~invalid], errors
+
+def _diff_existing(frame, existing, upload_id, user_id):
+    """Split graded rows for students who already have a result into updates.
+
+    existing maps student_id to the stored (id, marks, status, grade, remarks).
+    Returns (update_rows, change_rows, unchanged_count).
+    """
+    updates, changes, unchanged = [], [], 0
+    for row in frame.itertuples(index=False):
+        result_id, marks, status, grade, remarks = existing[row.student_id]
+        new = (float(row.marks_obtained), row.status, row.grade, row.remarks or None)
+        if new == (marks, status, grade, remarks):
+            unchanged += 1
+            continue
+        updates.append({
+            'id': result_id,
+            'marks_obtained': new[0],
+            'percentage': float(row.percentage),
+            'passed': bool(row.passed),
+            'status': new[1],
+            'grade': new[2],
+            'remarks': new[3],
+        })
+        changes.append({
+            'upload_id': upload_id,
+            'result_id': result_id,
+            'student_id': int(row.student_id),
+            'changed_by': user_id,
+            'old_marks': marks, 'new_marks': new[0],
+            'old_status': status, 'new_status': new[1],
+            'old_grade': grade, 'new_grade': new[2],
+            'old_remarks': remarks, 'new_remarks': new[3],
+        })
+    return updates, changes, unchanged
+
+def workbook_sheet_names(source):
+    """Names of the worksheets in an XLSX workbook, in order"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def parse_result_sheet(path, sheet_name):
+    """Read and validate one worksheet; runs in a worker process.
+
+    Returns (frame, errors) as prepare_result_frame does.
+    """
+    chunks = list(_iter_xlsx_chunks(path, 5000, sheet_name))
+    if not chunks:
+        return prepare_result_frame(pd.DataFrame(columns=list(REQUIRED_COLUMNS)))
+    return prepare_result_frame(pd.concat(chunks))
+
+def parse_workbook_sheets(path, sheet_names, processes):
+    """Parse sheets in parallel, yielding (sheet_name, future) as each finishes.
+
+    openpyxl parsing is CPU-bound, so sheets are spread over a process pool.
+    The pool uses spawn because it is started from a job thread, where
+    forking a multi-threaded process is unsafe. With a single worker the
+    sheets are parsed in this process instead.
+    """
+    from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+    workers = min(processes, len(sheet_names))
+    if workers <= 1:
+        for name in sheet_names:
+            future = Future()
+            try:
+                future.set_result(parse_result_sheet(path, name))
+            except Exception as e:
+                future.set_exception(e)
+            yield name, future
+        return
+
+    import multiprocessing
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(parse_result_sheet, path, name): name for name in sheet_names}
+        for future in as_completed(futures):
+            yield futures[future], future
+
+def import_result_sheet(frame, errors, exam_id, user_id, upsert=False, upload_id=None):
+    """Write a parsed sheet in one transaction and return (success, error_count, errors, updated).
+
+    Unlike import_result_chunks nothing is committed until the whole sheet
+    has been written, so a sheet is either imported completely or not at all.
+    """
+    exam = db.session.get(Exam, exam_id)
+    inserted, updated, unchanged, messages = write_result_frame(
+        frame, errors, exam, user_id, upsert=upsert, upload_id=upload_id)
+    db.session.commit()
+    invalidate_students(inserted + updated)
+    return len(inserted) + len(updated) + unchanged, len(messages), messages, len(updated)
+
+def import_result_frame(df, exam, user_id, upsert=False, upload_id=None):
+    """Validate and write one chunk of results.
+
+    Without upsert, rows for students who already have a result are errors.
+    With upsert they are compared with the stored result and only rows that
+    differ are updated, each change being logged against upload_id.
+
+    Returns (inserted_student_ids, updated_student_ids, unchanged_count, error_messages).
+    """
+    frame, errors = prepare_result_frame(df)
+    return write_result_frame(frame, errors, exam, user_id, upsert, upload_id)
+
+def roll_number_query(roll_numbers):
+    """(roll_number, id) of the students with these roll numbers"""
+    return db.session.query(Student.roll_number, Student.id).filter(Student.roll_number.in_(roll_numbers))
+
+def existing_result_query(exam_id, student_ids):
+    """Stored results of student_ids for exam_id, with the columns an upsert compares"""
+    return db.session.query(Result.id, Result.student_id, Result.marks_obtained,
+                            Result.status, Result.grade, Result.remarks)\
+                     .filter(Result.exam_id == exam_id, Result.student_id.in_(student_ids))
+
+def write_result_frame(frame, errors, exam, user_id, upsert=False, upload_id=None):
+    """Write rows already checked by prepare_result_frame; see import_result_frame"""
+    exam_id = exam.id
+    errors = list(errors)
+    rows, updates, changes, unchanged = [], [], [], 0
+
+    if not frame.empty:
+        # Resolve every roll number in the chunk with a single query
+        rolls = frame['roll_number'].unique().tolist()
+        student_ids = dict(roll_number_query(rolls).all())
+        frame = frame.assign(student_id=frame['roll_number'].map(student_ids))
+
+        missing = frame['student_id'].isna()
+        errors.extend((index, f"Student with roll number {roll} not found")
+                      for index, roll in frame.loc[missing, 'roll_number'].items())
+        frame = frame[~missing].astype({'student_id': int})
+
+        # Find results that already exist for this exam with a single query
+        existing = {student_id: (result_id, marks, status, grade, remarks)
+                    for result_id, student_id, marks, status, grade, remarks in
+                    existing_result_query(exam_id, frame['student_id'].unique().tolist())}
+        repeated = frame['student_id'].duplicated()
+        errors.extend((index, f"Duplicate row for {roll}" if upsert else f"Result already exists for {roll}")
+                      for index, roll in frame.loc[repeated, 'roll_number'].items())
+        frame = grade_frame(frame[~repeated], exam.total_marks, exam.passing_marks)
+
+        stored = frame['student_id'].isin(existing)
+        if upsert:
+            updates, changes, unchanged = _diff_existing(frame[stored], existing, upload_id, user_id)
+        else:
+            errors.extend((index, f"Result already exists for {roll}")
+                          for index, roll in frame.loc[stored, 'roll_number'].items())
+        frame = frame[~stored]
+
+        rows = [{
+            'student_id': int(row.student_id),
+            'exam_id': exam_id,
+            'marks_obtained': float(row.marks_obtained),
+            'percentage': float(row.percentage),
+            'passed': bool(row.passed),
+            'grade': row.grade,
+            'status': row.status,
+            'remarks': row.remarks or None,
+            'uploaded_by': user_id,
+        } for row in frame.itertuples(index=False)]
+
+        if rows:
+            db.session.execute(insert(Result), rows)
+            count_new_results(exam, len(rows))
+        if updates:
+            # Bulk UPDATE by primary key: one executemany for every changed row
+            db.session.execute(update(Result), updates)
+            db.session.execute(insert(ResultChange), changes)
+        if rows or updates:
+            refresh_transcripts([row['student_id'] for row in rows] +
+                                [change['student_id'] for change in changes])
+            invalidate_exam_statistics(exam_id)
+
+    errors.sort(key=lambda error: error[0])
+    return ([row['student_id'] for row in rows], [change['student_id'] for change in changes], unchanged,
+            [f"Row {index + 1}: {message}" for index, message in errors])
+
+def import_result_chunks(chunks, exam_id, user_id, progress=None, upsert=False, upload_id=None):
+    """Import an iterable of DataFrame chunks and return (success, error_count, errors, updated).
+
+    Each chunk is committed on its own; progress(success_count, errors,
+    updated_count) is called after every commit with the running totals.
+    Successful rows include results that were inserted, corrected or found
+    unchanged.
+    """
+    success_count = 0
+    updated_count = 0
+    errors = []
+    exam = db.session.get(Exam, exam_id)
+    # Detached, so the per-chunk commits do not expire it and reload it every time
+    db.session.expunge(exam)
+
+    for chunk in chunks:
+        inserted, updated, unchanged, chunk_errors = import_result_frame(
+            chunk, exam, user_id, upsert=upsert, upload_id=upload_id)
+        db.session.commit()
+        invalidate_students(inserted + updated)
+        success_count += len(inserted) + len(updated) + unchanged
+        updated_count += len(updated)
+        errors.extend(chunk_errors)
+        if progress is not None:
+            progress(success_count, errors, updated_count)
+
+    return success_count, len(errors), errors, updated_count
@@ -0,0 +1,46 @@
+"""
+Local background job runner
+
+Long-running admin work (such as importing a large result sheet) is handed to
+a small thread pool so that the request which queued it can return at once.
+No external broker is involved; jobs live only as long as the worker process.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app
+
+class JobRunner:
+    """Flask extension wrapping a per-application thread pool"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOBS_RUN_INLINE', False)
+        app.extensions['jobs'] = ThreadPoolExecutor(
+            max_workers=app.config['JOB_WORKERS'],
+            thread_name_prefix='result-jobs')
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) inside an app context on a worker thread"""
+        app = current_app._get_current_object()
+        if app.config['JOBS_RUN_INLINE']:
+            # Used by tests and single-threaded setups such as in-memory SQLite
+            future = Future()
+            try:
+                future.set_result(self._run(app, func, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return app.extensions['jobs'].submit(self._run, app, func, args, kwargs)
+
+    @staticmethod
+    def _run(app, func, args, kwargs):
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                app.logger.exception('Background job %s failed', func.__name__)
+                raise
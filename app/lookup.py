@@ -0,0 +1,111 @@
+"""
+Read-through cache for the public student result lookup
+
+Entries are keyed by student id and hold plain dicts (student details plus the
+student's stored transcript: ordered result rows and summary figures), so a
+miss reads one transcript row and a hit needs no query at all. Every path
+that writes a student's results, or edits an exam they sat, calls
+invalidate_students() after committing.
+
+Invalidation also leaves a fresh generation token for each student. A miss
+notes the token before reading the database and only stores its entry if
+the token is unchanged afterwards, so a read that raced with an import
+cannot put pre-import results back into the cache after it was cleared.
+
+Publishing an exam goes one step further and pre-renders each affected
+student's page to disk (see app.publishing); invalidation removes those too.
+"""
+
+import uuid
+from flask import current_app, render_template
+from app import db
+from app.cache import make_cache
+from app.models import Student, Result
+from app.transcripts import load_transcripts
+from app.publishing import store_published_page, has_published_pages, remove_published_pages
+
+def init_lookup_cache(app):
+    app.extensions['lookup_cache'] = make_cache(
+        app, 'lookup', app.config['LOOKUP_CACHE_SIZE'], app.config['LOOKUP_CACHE_TTL'])
+
+def credential_query(roll_number, id_card_number=None, phone_number=None):
+    """The Student matching a lookup's roll number and ID card (or phone) number"""
+    query = Student.query.filter_by(roll_number=roll_number)
+    if id_card_number:
+        query = query.filter_by(id_card_number=id_card_number)
+    elif phone_number:
+        query = query.filter_by(phone_number=phone_number)
+    return query
+
+def _student_info(student):
+    return {
+        'id': student.id,
+        'name': student.name,
+        'roll_number': student.roll_number,
+        'year': student.year,
+        'section': student.section,
+        'email': student.email,
+    }
+
+def _load_student_results(student):
+    return dict(load_transcripts([student.id])[student.id], student=_student_info(student))
+
+def load_result_sets(students):
+    """Result sets for many students with one transcript query, keyed by student id"""
+    transcripts = load_transcripts([student.id for student in students])
+    return {student.id: dict(transcripts[student.id], student=_student_info(student))
+            for student in students}
+
+def get_student_results(student_id):
+    """Return the cached result set for student_id, loading it on a miss.
+
+    Returns None if the student no longer exists.
+    """
+    cache = current_app.extensions['lookup_cache']
+    entry = cache.get(student_id)
+    if entry is None:
+        generation = cache.get(_generation_key(student_id))
+        # Usually already in the identity map from the credential query
+        student = db.session.get(Student, student_id)
+        if student is None:
+            return None
+        entry = _load_student_results(student)
+        if cache.get(_generation_key(student_id)) == generation:
+            cache.set(student_id, entry)
+    return entry
+
+def _generation_key(student_id):
+    return f'generation:{student_id}'
+
+def prerender_exam_results(exam_id, batch_size=500):
+    """Background job: pre-render the results page of every student who sat exam_id"""
+    student_ids = [student_id for (student_id,) in
+                   db.session.query(Result.student_id).filter_by(exam_id=exam_id)]
+    rendered = 0
+    for start in range(0, len(student_ids), batch_size):
+        students = Student.query.filter(Student.id.in_(student_ids[start:start + batch_size])).all()
+        entries = load_result_sets(students)
+        # A bare request context renders the page as an anonymous visitor sees it
+        with current_app.test_request_context():
+            for student in students:
+                entry = entries[student.id]
+                html = render_template('main/results.html',
+                                       title=f'Results for {student.name}',
+                                       student=entry['student'],
+                                       results=entry['results'],
+                                       summary=entry['summary'])
+                store_published_page(student, html)
+                rendered += 1
+    return rendered
+
+def invalidate_students(student_ids):
+    """Drop cached and pre-rendered result sets; call after the write has committed"""
+    cache = current_app.extensions['lookup_cache']
+    cache.delete_many(student_ids)
+    # Kept as long as an entry would be, so a read that started before this call never stores one
+    cache.set_many({_generation_key(student_id): uuid.uuid4().hex for student_id in student_ids})
+    if student_ids and has_published_pages():
+        students = db.session.query(Student.roll_number, Student.id_card_number,
+                                    Student.phone_number)\
+                             .filter(Student.id.in_(list(student_ids))).all()
+        remove_published_pages(students)
@@ -2,11 +2,13 @@
 Main application routes
 """
 
-from flask import render_template, request, flash
+from flask import render_template, request, flash, make_response, send_file, redirect, url_for, abort
 from app.main import bp
 from app.forms import StudentLookupForm
-from app.models import Student, Result
-from sqlalchemy import or_
+from app.lookup import credential_query, get_student_results
+from app.credentials import indexed_student_id, index_student
+from app.ratelimit import lookup_retry_after, charge_failed_lookup, is_known_bad_lookup, remember_bad_lookup
+from app.publishing import published_page_token, published_page_path
 
 @bp.route('/')
 @bp.route('/index')
@@ -25,27 +27,43 @@ def lookup_results():
         id_card_number = form.id_card_number.data
         phone_number = form.phone_number.data
         
-        # Build query based on provided authentication
-        query = Student.query.filter_by(roll_number=roll_number)
+        retry_after = lookup_retry_after(roll_number)
+        if retry_after:
+            flash('Too many lookups. Please wait a moment and try again.', 'warning')
+            response = make_response(render_template('main/index.html', title='University Result Portal', form=form), 429)
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response
         
-        if id_card_number:
-            query = query.filter_by(id_card_number=id_card_number)
-        elif phone_number:
-            query = query.filter_by(phone_number=phone_number)
+        # Published results were rendered ahead of time; send the browser to
+        # the stored page with a GET so that it can be revalidated
+        token = published_page_token(roll_number, id_card_number, phone_number)
+        if token:
+            return redirect(url_for('main.published_results', token=token), 303)
         
-        student = query.first()
+        # Indexed credentials are authenticated without a query; repeated bad
+        # combinations are answered without touching the database
+        student_id = indexed_student_id(roll_number, id_card_number, phone_number)
+        if student_id is None and not is_known_bad_lookup(roll_number, id_card_number, phone_number):
+            student = credential_query(roll_number, id_card_number, phone_number).first()
+            if student:
+                index_student(student)
+                student_id = student.id
+            else:
+                remember_bad_lookup(roll_number, id_card_number, phone_number)
+                # Only failed guesses count against the roll number (repeats of
+                # a remembered one guess nothing new), so junk lookups cannot
+                # cheaply lock a student out of their own results
+                charge_failed_lookup(roll_number)
         
-        if student:
-            # Get all results for this student
-            results = Result.query.filter_by(student_id=student.id)\
-                          .join(Result.exam)\
-                          .order_by('exam.year', 'exam.semester', 'exam.name').all()
-            
-            if results:
+        # Served from the lookup cache; only a miss touches the Result table
+        entry = get_student_results(student_id) if student_id else None
+        if entry:
+            if entry['results']:
                 return render_template('main/results.html', 
-                                     title=f'Results for {student.name}',
-                                     student=student, 
-                                     results=results)
+                                     title=f"Results for {entry['student']['name']}",
+                                     student=entry['student'], 
+                                     results=entry['results'],
+                                     summary=entry['summary'])
             else:
                 flash('No results found for this student.', 'info')
         else:
@@ -53,6 +71,18 @@ def lookup_results():
     
     return render_template('main/index.html', title='University Result Portal', form=form)
 
+@bp.route('/results/page/<token>')
+def published_results(token):
+    """A pre-rendered results page, addressed by its credential token"""
+    page = published_page_path(token)
+    if page is None:
+        abort(404)
+    response = send_file(page, mimetype='text/html', conditional=True, etag=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    # The token stands in for the student's credentials; keep it out of Referer headers
+    response.headers['Referrer-Policy'] = 'no-referrer'
+    return response
+
 @bp.route('/about')
 def about():
     """About page"""
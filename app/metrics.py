@@ -0,0 +1,134 @@
+"""
+Opt-in request and SQL instrumentation
+
+When METRICS_ENABLED is set, every request records its latency, the number
+of SQL statements it issued and the time spent in them, labelled by Flask
+endpoint. Statements slower than SLOW_QUERY_THRESHOLD_MS are logged from any
+thread. Figures are kept per worker process and rendered in Prometheus text
+format by the admin metrics endpoint.
+"""
+
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+        self.total += 1
+        self.sum += value
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    """Per-endpoint request and SQL figures for one worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.statements = {}
+        self.sql_time = {}
+
+    def record_request(self, endpoint, seconds, sql_count, sql_seconds):
+        with self._lock:
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram(LATENCY_BUCKETS)
+                self.statements[endpoint] = Histogram(STATEMENT_BUCKETS)
+                self.sql_time[endpoint] = 0.0
+            self.latency[endpoint].observe(seconds)
+            self.statements[endpoint].observe(sql_count)
+            self.sql_time[endpoint] += sql_seconds
+
+    def _histogram_lines(self, name, histograms):
+        for endpoint, histogram in sorted(histograms.items()):
+            label = f'endpoint="{_label(endpoint)}"'
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                yield f'{name}_bucket{{{label},le="{bound}"}} {count}'
+            yield f'{name}_bucket{{{label},le="+Inf"}} {histogram.total}'
+            yield f'{name}_sum{{{label}}} {histogram.sum}'
+            yield f'{name}_count{{{label}}} {histogram.total}'
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP result_portal_request_duration_seconds Request latency by endpoint.',
+                '# TYPE result_portal_request_duration_seconds histogram',
+            ]
+            lines.extend(self._histogram_lines('result_portal_request_duration_seconds', self.latency))
+            lines += [
+                '# HELP result_portal_request_sql_statements SQL statements issued per request.',
+                '# TYPE result_portal_request_sql_statements histogram',
+            ]
+            lines.extend(self._histogram_lines('result_portal_request_sql_statements', self.statements))
+            lines += [
+                '# HELP result_portal_sql_duration_seconds_total Time spent executing SQL by endpoint.',
+                '# TYPE result_portal_sql_duration_seconds_total counter',
+            ]
+            lines.extend(f'result_portal_sql_duration_seconds_total{{endpoint="{_label(endpoint)}"}} {seconds}'
+                         for endpoint, seconds in sorted(self.sql_time.items()))
+        return '\n'.join(lines) + '\n'
+
+class Metrics:
+    """Flask extension wiring the registry into request hooks and engine events"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 500)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        registry = MetricsRegistry()
+        app.extensions['metrics'] = registry
+        slow_threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000.0
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+            g.sql_count = 0
+            g.sql_seconds = 0.0
+
+        @app.teardown_request
+        def record_request(exc):
+            started = g.pop('metrics_started', None)
+            if started is None:
+                return
+            registry.record_request(request.endpoint or 'unknown',
+                                    time.perf_counter() - started,
+                                    g.get('sql_count', 0), g.get('sql_seconds', 0.0))
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context.metrics_started = time.perf_counter()
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context.metrics_started
+            if has_request_context() and 'sql_count' in g:
+                g.sql_count += 1
+                g.sql_seconds += elapsed
+            if elapsed >= slow_threshold:
+                app.logger.warning('Slow query (%.1f ms): %s', elapsed * 1000, statement)
+
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', after_cursor_execute)
@@ -3,6 +3,7 @@ Database models for University Result Portal
 """
 
 from datetime import datetime
+from flask import current_app
 from flask_login import UserMixin
 from app import db, bcrypt
 
@@ -21,6 +22,15 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
     
+    def password_needs_rehash(self):
+        """True if the stored hash was made with a cost other than BCRYPT_LOG_ROUNDS"""
+        try:
+            # bcrypt hashes look like $2b$12$<salt and digest>
+            rounds = int(self.password_hash.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return True
+        return rounds != current_app.config['BCRYPT_LOG_ROUNDS']
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -55,10 +65,15 @@ class Exam(db.Model):
     exam_date = db.Column(db.Date, nullable=True)
     result_published_date = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every write to the exam's results; NULL counts as 0
+    results_version = db.Column(db.Integer, nullable=True, default=0)
     
     # Relationship with results
     results = db.relationship('Result', backref='exam', lazy='dynamic')
     
+    # Exam listings sort by (year desc, semester desc)
+    __table_args__ = (db.Index('ix_exam_year_semester', 'year', 'semester'),)
+    
     def __repr__(self):
         return f'<Exam {self.name} - {self.subject}>'
 
@@ -70,22 +85,21 @@ class Result(db.Model):
     marks_obtained = db.Column(db.Float, nullable=False)
     grade = db.Column(db.String(5), nullable=True)  # A+, A, B+, etc.
     status = db.Column(db.String(20), nullable=False)  # Pass, Fail, Absent
+    # Derived by app.grading when the result is written
+    percentage = db.Column(db.Float, nullable=True)
+    passed = db.Column(db.Boolean, nullable=True)
     remarks = db.Column(db.Text, nullable=True)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Composite unique constraint to prevent duplicate results
-    __table_args__ = (db.UniqueConstraint('student_id', 'exam_id', name='_student_exam_uc'),)
-    
-    @property
-    def percentage(self):
-        if self.exam.total_marks > 0:
-            return (self.marks_obtained / self.exam.total_marks) * 100
-        return 0
+    # Composite unique constraint to prevent duplicate results; it leads with
+    # student_id, so per-exam queries get their own index
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'exam_id', name='_student_exam_uc'),
+        db.Index('ix_result_exam_student', 'exam_id', 'student_id'),
+    )
     
-    @property
-    def is_pass(self):
-        return self.status.lower() == 'pass' and self.marks_obtained >= self.exam.passing_marks
+    is_pass = db.synonym('passed')
     
     def __repr__(self):
         return f'<Result {self.student.roll_number} - {self.exam.name}: {self.marks_obtained}>'
@@ -102,6 +116,94 @@ class ResultUpload(db.Model):
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='Processing')  # Processing, Completed, Failed
     error_log = db.Column(db.Text, nullable=True)
+    mode = db.Column(db.String(10), nullable=True, default='insert')  # insert, upsert
+    updated_records = db.Column(db.Integer, nullable=True, default=0)
+    
+    exam = db.relationship('Exam')
+    
+    # Corrections applied by an upsert upload
+    changes = db.relationship('ResultChange', backref='upload', lazy='dynamic')
+    
+    def __repr__(self):
+        return f'<ResultUpload {self.filename} - {self.status}>'
+
+class RosterUpload(db.Model):
+    """Track student roster upload batches"""
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    total_records = db.Column(db.Integer, nullable=False)
+    successful_records = db.Column(db.Integer, nullable=False)
+    failed_records = db.Column(db.Integer, nullable=False)
+    updated_records = db.Column(db.Integer, nullable=False, default=0)
+    upload_date = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='Processing')  # Processing, Completed, Failed
+    error_log = db.Column(db.Text, nullable=True)
+    mode = db.Column(db.String(10), nullable=False, default='insert')  # insert, update
+    
+    def __repr__(self):
+        return f'<RosterUpload {self.filename} - {self.status}>'
+
+class ResultChange(db.Model):
+    """One correction applied to an existing result by an upsert upload"""
+    __tablename__ = 'result_change'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.Integer, db.ForeignKey('result_upload.id'), nullable=False, index=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('result.id'), nullable=False, index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    old_marks = db.Column(db.Float, nullable=False)
+    new_marks = db.Column(db.Float, nullable=False)
+    old_status = db.Column(db.String(20), nullable=False)
+    new_status = db.Column(db.String(20), nullable=False)
+    old_grade = db.Column(db.String(5), nullable=True)
+    new_grade = db.Column(db.String(5), nullable=True)
+    old_remarks = db.Column(db.Text, nullable=True)
+    new_remarks = db.Column(db.Text, nullable=True)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    student = db.relationship('Student')
+    
+    def __repr__(self):
+        return f'<ResultChange result={self.result_id} {self.old_marks} -> {self.new_marks}>'
+
+class ExamStatistics(db.Model):
+    """Materialized result statistics for an exam, rebuilt on demand after invalidation"""
+    __tablename__ = 'exam_statistics'
+    
+    exam_id = db.Column(db.Integer, db.ForeignKey('exam.id'), primary_key=True)
+    total_students = db.Column(db.Integer, nullable=False)
+    passed_students = db.Column(db.Integer, nullable=False)
+    avg_marks = db.Column(db.Float, nullable=True)
+    highest_marks = db.Column(db.Float, nullable=True)
+    lowest_marks = db.Column(db.Float, nullable=True)
+    grade_distribution = db.Column(db.Text, nullable=False, default='{}')  # JSON: grade -> count
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    results_version = db.Column(db.Integer, nullable=True)  # Exam.results_version the figures were computed at
+    
+    def __repr__(self):
+        return f'<ExamStatistics exam={self.exam_id} total={self.total_students}>'
+
+class StudentTranscript(db.Model):
+    """A student's results pre-joined to their exams, rebuilt whenever those results change"""
+    __tablename__ = 'student_transcript'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    results = db.Column(db.Text, nullable=False, default='[]')  # JSON: ordered result rows
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+    passed_count = db.Column(db.Integer, nullable=False, default=0)
+    average_percentage = db.Column(db.Float, nullable=True)
+    grade_point_average = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StudentTranscript student={self.student_id} results={self.result_count}>'
+
+class Counter(db.Model):
+    """A running total shown on the admin dashboard (see app.counters)"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
     
     def __repr__(self):
-        return f'<ResultUpload {self.filename} - {self.status}>'
\ No newline at end of file
+        return f'<Counter {self.name}={self.value}>'
@@ -0,0 +1,102 @@
+"""
+Keyset (cursor) pagination
+
+Instead of OFFSET, each page filters on the sort key of the last row already
+shown, so page 200 costs the same index seek as page 1. Cursors are opaque,
+signed tokens carrying the direction and the boundary key. Totals come from a
+short-lived cache rather than a COUNT(*) per page.
+"""
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import tuple_
+from app.cache import make_cache
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move either way"""
+
+    def __init__(self, items, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-cursor')
+
+def encode_cursor(direction, values):
+    return _serializer().dumps([direction, list(values)])
+
+def decode_cursor(token):
+    """Return (direction, values); a missing or tampered token means the first page"""
+    if not token:
+        return 'next', None
+    try:
+        direction, values = _serializer().loads(token)
+    except (BadSignature, ValueError, TypeError):
+        return 'next', None
+    if direction not in ('next', 'prev'):
+        return 'next', None
+    return direction, values
+
+def _page_query(query, keys, per_page, backwards, values, descending):
+    # Walking backwards reads the preceding rows in reverse, then flips them
+    ascending = descending == backwards
+    if values is not None:
+        boundary = tuple_(*keys) > tuple_(*values) if ascending else tuple_(*keys) < tuple_(*values)
+        query = query.filter(boundary)
+    ordering = [key.asc() if ascending else key.desc() for key in keys]
+    return query.order_by(*ordering).limit(per_page + 1)
+
+def keyset_query(query, keys, per_page, cursor=None, descending=False):
+    """The query keyset_paginate runs for cursor, e.g. to EXPLAIN it"""
+    direction, values = decode_cursor(cursor)
+    return _page_query(query, keys, per_page, direction == 'prev', values, descending)
+
+def keyset_paginate(query, keys, key_of, per_page, cursor=None, descending=False, total=None):
+    """Fetch one page of query ordered by keys.
+
+    keys must form a unique ordering (add the primary key as a tie-breaker if
+    needed) and all sort the same way; key_of(item) returns an item's values
+    for them.
+    """
+    direction, values = decode_cursor(cursor)
+    backwards = direction == 'prev'
+    items = _page_query(query, keys, per_page, backwards, values, descending).all()
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    if not items:
+        return KeysetPage(items, None, None, total)
+
+    more_after = True if backwards else has_more
+    more_before = has_more if backwards else values is not None
+    return KeysetPage(
+        items,
+        encode_cursor('next', key_of(items[-1])) if more_after else None,
+        encode_cursor('prev', key_of(items[0])) if more_before else None,
+        total
+    )
+
+def cached_count(key, query):
+    """COUNT(*) for query, reused for PAGINATION_COUNT_TTL seconds"""
+    cache = current_app.extensions.get('count_cache')
+    if cache is None:
+        cache = current_app.extensions['count_cache'] = make_cache(
+            current_app, 'count', 1024, current_app.config['PAGINATION_COUNT_TTL'])
+    total = cache.get(key)
+    if total is None:
+        total = query.count()
+        cache.set(key, total)
+    return total
@@ -0,0 +1,72 @@
+"""
+Pre-rendered result pages for published exams
+
+When an exam is published each affected student's results page is rendered
+once and written to PUBLISHED_RESULTS_FOLDER under two unguessable tokens:
+an HMAC of their roll number with their ID card number, and one with their
+phone number. The lookup handler derives the token from the submitted
+credentials and, if a page exists, redirects (303) to /results/page/<token>,
+which serves the file without any query or template work. Being a GET, that
+page carries an ETag and Last-Modified, so a student refreshing it gets a
+304 until the page is re-rendered.
+"""
+
+import hashlib
+import hmac
+import os
+import re
+import threading
+from flask import current_app
+
+TOKEN_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+def result_token(roll_number, id_card_number=None, phone_number=None):
+    """Token for a credential pair; ID card takes precedence like the lookup form"""
+    if id_card_number:
+        material = f'id\0{roll_number}\0{id_card_number}'
+    else:
+        material = f'phone\0{roll_number}\0{phone_number}'
+    key = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(key, material.encode(), hashlib.sha256).hexdigest()
+
+def _page_path(token):
+    return os.path.join(current_app.config['PUBLISHED_RESULTS_FOLDER'], f'{token}.html')
+
+def has_published_pages():
+    return os.path.isdir(current_app.config['PUBLISHED_RESULTS_FOLDER'])
+
+def published_page_token(roll_number, id_card_number=None, phone_number=None):
+    """Token of the stored page for these credentials, or None"""
+    token = result_token(roll_number, id_card_number, phone_number)
+    return token if os.path.exists(_page_path(token)) else None
+
+def published_page_path(token):
+    """Path of the stored page for token, or None"""
+    if not TOKEN_PATTERN.fullmatch(token):
+        return None
+    path = _page_path(token)
+    return path if os.path.exists(path) else None
+
+def store_published_page(student, html):
+    """Write html under both of student's credential tokens"""
+    folder = current_app.config['PUBLISHED_RESULTS_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    data = html.encode('utf-8')
+    for token in (result_token(student.roll_number, id_card_number=student.id_card_number),
+                  result_token(student.roll_number, phone_number=student.phone_number)):
+        path = _page_path(token)
+        # Write then rename so a concurrent lookup never reads a partial page
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+
+def remove_published_pages(students):
+    """Delete stored pages for (roll_number, id_card_number, phone_number) rows"""
+    for roll_number, id_card_number, phone_number in students:
+        for token in (result_token(roll_number, id_card_number=id_card_number),
+                      result_token(roll_number, phone_number=phone_number)):
+            try:
+                os.remove(_page_path(token))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,162 @@
+"""
+Token-bucket rate limiting and negative caching for the student lookup
+
+Each client IP and each roll number gets a bucket that refills at its limit
+per minute. Every lookup is charged to its IP, but a roll number is only
+charged for lookups whose credentials fail, so a student's own successful
+lookups never use up their allowance. Behind a reverse proxy set
+TRUSTED_PROXIES so the client IP is read from X-Forwarded-For instead of
+being the proxy's address. With CACHE_DIR set (point it at /dev/shm to keep it in shared
+memory) buckets live in a SQLite file so limits hold across all workers on
+the host; otherwise each worker keeps its own.
+
+Failed credential combinations are remembered for LOOKUP_NEGATIVE_CACHE_TTL
+seconds under a digest of the submitted values, so retrying the same bad
+combination never reaches the database.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from app.cache import make_cache
+
+class MemoryBuckets:
+    """Per-process token buckets, bounded to maxsize keys (least recent dropped)"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period=60.0):
+        """Take one token; return 0 if allowed, else seconds until one is free"""
+        now = time.monotonic()
+        rate = limit / period
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / rate
+
+    def peek(self, key, limit, period=60.0):
+        """Like consume, but without taking the token"""
+        now = time.monotonic()
+        rate = limit / period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit, now))
+        tokens = min(limit, tokens + (now - updated) * rate)
+        return 0 if tokens >= 1 else (1 - tokens) / rate
+
+class SQLiteBuckets:
+    """Token buckets shared by every worker process through a local SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute('CREATE TABLE IF NOT EXISTS buckets '
+                                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, limit, period=60.0):
+        now = time.time()
+        rate = limit / period
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (limit, now)
+            tokens = min(limit, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return 0 if allowed else (1 - tokens) / rate
+
+    def peek(self, key, limit, period=60.0):
+        now = time.time()
+        rate = limit / period
+        row = self._connect().execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        tokens, updated = row if row else (limit, now)
+        tokens = min(limit, tokens + (now - updated) * rate)
+        return 0 if tokens >= 1 else (1 - tokens) / rate
+
+def init_rate_limits(app):
+    cache_dir = app.config.get('CACHE_DIR')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        buckets = SQLiteBuckets(os.path.join(cache_dir, 'ratelimit.sqlite3'))
+    else:
+        buckets = MemoryBuckets()
+    app.extensions['lookup_buckets'] = buckets
+    app.extensions['lookup_misses'] = make_cache(
+        app, 'lookup-miss', 100000, app.config['LOOKUP_NEGATIVE_CACHE_TTL'])
+
+def lookup_retry_after(roll_number):
+    """Charge this lookup to the client IP and check the roll number's allowance.
+
+    Returns 0 when the lookup may proceed, otherwise the number of seconds
+    the client should wait. The roll number is only charged by
+    charge_failed_lookup().
+    """
+    if not current_app.config['RATELIMIT_ENABLED']:
+        return 0
+    buckets = current_app.extensions['lookup_buckets']
+    retry_after = buckets.consume(f'ip:{request.remote_addr}', current_app.config['LOOKUP_IP_LIMIT'])
+    if not retry_after:
+        retry_after = buckets.peek(f'roll:{roll_number}', current_app.config['LOOKUP_ROLL_LIMIT'])
+    return retry_after
+
+def charge_failed_lookup(roll_number):
+    """Charge a lookup whose credentials did not match to its roll number"""
+    if current_app.config['RATELIMIT_ENABLED']:
+        current_app.extensions['lookup_buckets'].consume(f'roll:{roll_number}',
+                                                         current_app.config['LOOKUP_ROLL_LIMIT'])
+
+def _credential_digest(roll_number, id_card_number, phone_number):
+    if id_card_number:
+        material = f'{roll_number}\0id\0{id_card_number}'
+    else:
+        material = f'{roll_number}\0phone\0{phone_number}'
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def is_known_bad_lookup(roll_number, id_card_number, phone_number):
+    digest = _credential_digest(roll_number, id_card_number, phone_number)
+    return current_app.extensions['lookup_misses'].get(digest) is not None
+
+def remember_bad_lookup(roll_number, id_card_number, phone_number):
+    digest = _credential_digest(roll_number, id_card_number, phone_number)
+    current_app.extensions['lookup_misses'].set(digest, True)
+
+def forget_bad_lookups(student):
+    """Clear remembered failures that student's current credentials would now satisfy"""
+    forget_bad_lookups_many([(student.roll_number, student.id_card_number, student.phone_number)])
+
+def forget_bad_lookups_many(credentials):
+    """forget_bad_lookups for many (roll, id card, phone) triples at once"""
+    digests = []
+    for roll_number, id_card_number, phone_number in credentials:
+        digests.append(_credential_digest(roll_number, id_card_number, None))
+        digests.append(_credential_digest(roll_number, None, phone_number))
+    current_app.extensions['lookup_misses'].delete_many(digests)
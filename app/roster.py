@@ -0,0 +1,164 @@
+"""
+Set-based import engine for student rosters
+
+Works like app.imports for result sheets. The roll numbers of a whole chunk
+are checked against Student with one query, new students are written with a
+single bulk insert, and in update mode changed ID card and phone numbers are
+written with one bulk UPDATE by primary key. Other details of students who
+already exist are left alone.
+
+Changing a student's credentials also removes the result pages published
+under the old ones, before the change commits, and swaps the old
+credentials for the new ones in the lookup credential index.
+"""
+
+import pandas as pd
+from sqlalchemy import insert, update
+from app import db
+from app.models import Student
+from app.counters import count_new_students
+from app.credentials import index_students
+from app.publishing import has_published_pages, remove_published_pages
+from app.ratelimit import forget_bad_lookups_many
+
+# (column, maximum length); all are required except email and section
+ROSTER_COLUMNS = (
+    ('roll_number', 20),
+    ('id_card_number', 20),
+    ('phone_number', 15),
+    ('name', 100),
+    ('email', 120),
+    ('section', 10),
+)
+REQUIRED_COLUMNS = ('roll_number', 'id_card_number', 'phone_number', 'name', 'year')
+ROSTER_DTYPE = str  # keeps leading zeros of phone numbers in CSV files
+
+def _cell_text(value):
+    """A cell as stripped text; whole numbers from Excel lose their trailing .0"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def prepare_roster_frame(df):
+    """Validate and normalise a chunk of an uploaded roster.
+
+    Returns a frame holding only the rows that passed, together with a list
+    of (index, message) pairs for the rows that did not.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        return df.iloc[0:0], [(index, f"missing column {missing[0]!r}") for index in df.index]
+
+    frame = pd.DataFrame(index=df.index)
+    errors = {}
+    for column, max_length in ROSTER_COLUMNS:
+        values = df[column].map(_cell_text) if column in df.columns else pd.Series('', index=df.index)
+        if column in REQUIRED_COLUMNS:
+            for index in values.index[values == '']:
+                errors.setdefault(index, f"{column} is missing")
+        for index in values.index[values.str.len() > max_length]:
+            errors.setdefault(index, f"{column} is longer than {max_length} characters")
+        frame[column] = values
+
+    years = pd.to_numeric(df['year'].map(_cell_text), errors='coerce')
+    for index in years.index[~years.isin(range(1, 6))]:
+        errors.setdefault(index, f"year must be 1 to 5, got {df.at[index, 'year']!r}")
+    frame['year'] = years
+
+    for index, roll in frame.loc[frame['roll_number'].duplicated() & (frame['roll_number'] != ''),
+                                 'roll_number'].items():
+        errors.setdefault(index, f"Duplicate row for {roll}")
+
+    valid = ~frame.index.isin(list(errors))
+    return frame[valid].astype({'year': int}), sorted(errors.items())
+
+def import_roster_frame(df, update_credentials=False):
+    """Validate and write one chunk of a roster.
+
+    Without update_credentials, rows for roll numbers that already exist are
+    errors. With it, their ID card and phone numbers are updated where they
+    differ.
+
+    Returns (inserted_rows, updated_rows, previous_credentials, unchanged_count,
+    error_messages); the rows are (id, roll, id card, phone) tuples.
+    """
+    frame, errors = prepare_roster_frame(df)
+    inserted, updated, previous, unchanged = [], [], [], 0
+
+    if not frame.empty:
+        # Check every roll number in the chunk with a single query
+        existing = {roll: (student_id, id_card_number, phone_number)
+                    for student_id, roll, id_card_number, phone_number in
+                    db.session.query(Student.id, Student.roll_number, Student.id_card_number,
+                                     Student.phone_number)
+                    .filter(Student.roll_number.in_(frame['roll_number'].tolist()))}
+
+        stored = frame['roll_number'].isin(list(existing))
+        changes = []
+        if update_credentials:
+            for row in frame[stored].itertuples(index=False):
+                student_id, id_card_number, phone_number = existing[row.roll_number]
+                if (row.id_card_number, row.phone_number) == (id_card_number, phone_number):
+                    unchanged += 1
+                    continue
+                changes.append({'id': student_id, 'id_card_number': row.id_card_number,
+                                'phone_number': row.phone_number})
+                updated.append((student_id, row.roll_number, row.id_card_number, row.phone_number))
+                previous.append((row.roll_number, id_card_number, phone_number))
+        else:
+            errors.extend((index, f"Student {roll} already exists")
+                          for index, roll in frame.loc[stored, 'roll_number'].items())
+        frame = frame[~stored]
+
+        rows = [{
+            'roll_number': row.roll_number,
+            'id_card_number': row.id_card_number,
+            'phone_number': row.phone_number,
+            'name': row.name,
+            'email': row.email or None,
+            'year': int(row.year),
+            'section': row.section or None,
+        } for row in frame.itertuples(index=False)]
+
+        if rows:
+            db.session.execute(insert(Student), rows)
+            count_new_students([row['year'] for row in rows])
+            inserted = db.session.query(Student.id, Student.roll_number, Student.id_card_number,
+                                        Student.phone_number)\
+                                 .filter(Student.roll_number.in_([row['roll_number'] for row in rows])).all()
+        if changes:
+            # Bulk UPDATE by primary key: one executemany for every changed student
+            db.session.execute(update(Student), changes)
+            # Pages published under the old credentials must not outlive the change
+            if has_published_pages():
+                remove_published_pages(previous)
+
+    errors.sort(key=lambda error: error[0])
+    return ([tuple(row) for row in inserted], updated, previous, unchanged,
+            [f"Row {index + 1}: {message}" for index, message in errors])
+
+def import_roster_chunks(chunks, progress=None, update_credentials=False):
+    """Import an iterable of DataFrame chunks and return (success, error_count, errors, updated).
+
+    Each chunk is committed on its own; progress(success_count, errors,
+    updated_count) is called after every commit with the running totals.
+    """
+    success_count = 0
+    updated_count = 0
+    errors = []
+
+    for chunk in chunks:
+        inserted, updated, previous, unchanged, chunk_errors = import_roster_frame(
+            chunk, update_credentials=update_credentials)
+        db.session.commit()
+        index_students(inserted + updated, previous)
+        forget_bad_lookups_many([credentials[1:] for credentials in inserted + updated])
+        success_count += len(inserted) + len(updated) + unchanged
+        updated_count += len(updated)
+        errors.extend(chunk_errors)
+        if progress is not None:
+            progress(success_count, errors, updated_count)
+
+    return success_count, len(errors), errors, updated_count
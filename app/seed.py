@@ -0,0 +1,274 @@
+"""
+Sample and synthetic data for `flask seed`
+
+generate_dataset() builds a synthetic university of any size for
+performance work: N students, M exams spread over the five years, and a
+result for every student in every exam of their year. All values come from
+a numpy generator seeded with a fixed seed, so the same arguments always
+build the same dataset. Marks are generated and graded a year at a time with
+the grading engine. Rows are written student by student (so the
+(student_id, exam_id) unique index only ever appends) with one executemany
+per batch, all in one transaction. Transcripts and dashboard counters are
+built from the generated values rather than read back from the database.
+
+seed_sample_data() loads the small demo dataset that init_db.py sets up.
+"""
+
+import json
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, Boolean, Float, Integer, String
+from app import db
+from app.counters import rebuild_counters
+from app.grading import grade_frame, grade_result
+from app.models import User, Student, Exam, Result, StudentTranscript
+from app.transcripts import refresh_transcripts, summarize
+
+SUBJECTS = ['Anatomy', 'Physiology', 'Biochemistry', 'Pathology', 'Pharmacology',
+            'Microbiology', 'Forensic Medicine', 'Community Medicine', 'Medicine',
+            'Surgery', 'Gynaecology', 'Paediatrics', 'Ophthalmology', 'ENT']
+EXAM_TYPES = ['mid-term', 'final', 'sessional', 'practical']
+TOTAL_MARKS = [50.0, 75.0, 100.0, 150.0, 200.0]
+
+STUDENT_COLUMNS = ('roll_number', 'id_card_number', 'phone_number', 'name', 'email', 'year', 'section')
+EXAM_COLUMNS = ('name', 'exam_type', 'year', 'semester', 'subject', 'total_marks', 'passing_marks', 'exam_date')
+RESULT_COLUMNS = ('student_id', 'exam_id', 'marks_obtained', 'percentage', 'passed', 'grade', 'status')
+TRANSCRIPT_COLUMNS = ('student_id', 'results', 'result_count', 'passed_count', 'average_percentage',
+                      'grade_point_average')
+
+SQLITE_SEED_CACHE_KIB = 256 * 1024
+# Column types the DBAPI binds as-is, so bulk_insert skips their bind processors
+NATIVE_TYPES = (Boolean, Float, Integer, String)
+
+def student_credentials(index):
+    """Roll number, ID card and phone of the index-th synthetic student"""
+    return f'B{index:07d}', f'IDC{index:07d}', f'0300{index:07d}'
+
+def bulk_insert(table, columns, rows, constants=None):
+    """Insert row tuples (values for columns) with a single executemany.
+
+    constants maps further columns to one value shared by every row. On
+    qmark drivers (SQLite) the tuples go straight to the DBAPI cursor,
+    skipping SQLAlchemy's per-row parameter handling for numeric, boolean
+    and string columns, which the driver binds natively.
+    """
+    if not rows:
+        return
+    constants = constants or {}
+    connection = db.session.connection()
+    dialect = connection.dialect
+    if dialect.paramstyle != 'qmark':
+        connection.execute(insert(table), [dict(zip(columns, row), **constants) for row in rows])
+        return
+
+    def processor(name):
+        return table.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+
+    shared = []
+    for name, value in constants.items():
+        process = processor(name)
+        shared.append(process(value) if process else value)
+    shared = tuple(shared)
+    # Dates and other non-native types still need converting row by row
+    converters = [(position, processor(name)) for position, name in enumerate(columns)
+                  if not isinstance(table.c[name].type, NATIVE_TYPES) and processor(name)]
+    if converters:
+        rows = [list(row) for row in rows]
+        for row in rows:
+            for position, process in converters:
+                if row[position] is not None:
+                    row[position] = process(row[position])
+        rows = [tuple(row) for row in rows]
+    quote = dialect.identifier_preparer.quote
+    names = [*columns, *constants]
+    statement = (f'INSERT INTO {dialect.identifier_preparer.format_table(table)} '
+                 f'({", ".join(quote(name) for name in names)}) VALUES ({", ".join("?" * len(names))})')
+    connection.exec_driver_sql(statement, [row + shared for row in rows] if shared else rows)
+
+def _admin_user(username, password):
+    admin = User.query.filter_by(username=username).first()
+    if admin is None:
+        admin = User(username=username, email=f'{username}@university.edu', is_admin=True)
+        admin.set_password(password)
+        db.session.add(admin)
+        db.session.flush()
+    return admin
+
+def _transcript_rows(student_ids, exams, marks, graded):
+    """(student, JSON rows, summary...) tuples for a block of students, in transcript order"""
+    percentage, passed, status, grade = graded
+    rows = []
+    for position, student_id in enumerate(student_ids):
+        results = [dict(exam, marks_obtained=mark, percentage=pct, grade=letter,
+                        status=state, is_pass=is_pass)
+                   for exam, mark, pct, letter, state, is_pass in
+                   zip(exams, marks[position].tolist(), percentage[position].tolist(),
+                       grade[position].tolist(), status[position].tolist(), passed[position].tolist())]
+        summary = summarize(results)
+        rows.append((student_id, json.dumps(results), summary['result_count'], summary['passed_count'],
+                     summary['average_percentage'], summary['grade_point_average']))
+    return rows
+
+def generate_dataset(students=1000, exams=20, seed=42, batch_size=1000,
+                     username='benchadmin', password='benchpass', transcripts=True):
+    """Create an admin user, students, exams and their results in the current transaction.
+
+    batch_size is the number of students whose results go into one
+    executemany. The caller commits. Returns (admin, student_count,
+    exam_ids, result_count).
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    sqlite = connection.dialect.name == 'sqlite'
+    if sqlite:
+        # A large page cache keeps index updates for millions of rows in memory
+        cache_size = connection.exec_driver_sql('PRAGMA cache_size').scalar()
+        connection.exec_driver_sql(f'PRAGMA cache_size=-{SQLITE_SEED_CACHE_KIB}')
+
+    try:
+        admin = _admin_user(username, password)
+
+        sections = rng.choice(list('ABCD'), size=students).tolist()
+        bulk_insert(Student.__table__, STUDENT_COLUMNS, [
+            (*student_credentials(index), f'Student {index}', f'student{index}@student.edu',
+             index % 5 + 1, sections[index])
+            for index in range(students)
+        ], {'created_at': now})
+
+        exam_rows = []
+        for index in range(exams):
+            year = index % 5 + 1
+            exam_type = EXAM_TYPES[rng.integers(len(EXAM_TYPES))]
+            total_marks = TOTAL_MARKS[rng.integers(len(TOTAL_MARKS))]
+            exam_rows.append((f'{exam_type.title()} Examination {index}', exam_type, year,
+                              year * 2 - int(rng.integers(2)), SUBJECTS[index % len(SUBJECTS)],
+                              total_marks, total_marks / 2, None))
+        bulk_insert(Exam.__table__, EXAM_COLUMNS, exam_rows, {'created_at': now})
+
+        student_ids = pd.DataFrame(db.session.query(Student.id, Student.year).order_by(Student.id).all(),
+                                   columns=['id', 'year'])
+        # Transcript order, so each student's results are generated in the order they are shown
+        exam_list = db.session.query(Exam.id, Exam.name, Exam.subject, Exam.year, Exam.semester,
+                                     Exam.total_marks, Exam.passing_marks)\
+                              .order_by(Exam.year, Exam.semester, Exam.name).all()
+
+        result_count = 0
+        for year in range(1, 6):
+            ids = student_ids.loc[student_ids['year'] == year, 'id'].to_numpy()
+            year_exams = [exam for exam in exam_list if exam.year == year]
+            if not len(ids) or not year_exams:
+                continue
+
+            shape = (len(ids), len(year_exams))
+            scores = np.clip(rng.normal(62, 15, shape), 0, 100)
+            absent = rng.random(shape) < 0.02
+            totals = np.array([exam.total_marks for exam in year_exams])
+            marks = np.where(absent, 0.0, np.round(scores / 100 * totals, 1))
+
+            percentage, passed = np.empty(shape), np.empty(shape, dtype=bool)
+            status, grade = np.empty(shape, dtype=object), np.empty(shape, dtype=object)
+            for column, exam in enumerate(year_exams):
+                graded = grade_frame(pd.DataFrame({'marks_obtained': marks[:, column],
+                                                   'status': np.where(absent[:, column], 'Absent', '')}),
+                                     exam.total_marks, exam.passing_marks)
+                percentage[:, column] = graded['percentage'].to_numpy()
+                passed[:, column] = graded['passed'].to_numpy()
+                status[:, column] = graded['status'].to_numpy()
+                grade[:, column] = graded['grade'].to_numpy()
+
+            exam_ids = np.array([exam.id for exam in year_exams])
+            exam_fields = [{'exam_name': exam.name, 'subject': exam.subject, 'year': exam.year,
+                            'semester': exam.semester, 'total_marks': exam.total_marks}
+                           for exam in year_exams]
+            for start in range(0, len(ids), batch_size):
+                block = slice(start, start + batch_size)
+                count = len(ids[block])
+                bulk_insert(Result.__table__, RESULT_COLUMNS, list(zip(
+                    np.repeat(ids[block], len(year_exams)).tolist(),
+                    np.tile(exam_ids, count).tolist(),
+                    marks[block].ravel().tolist(),
+                    percentage[block].ravel().tolist(),
+                    passed[block].ravel().tolist(),
+                    grade[block].ravel().tolist(),
+                    status[block].ravel().tolist(),
+                )), {'uploaded_by': admin.id, 'created_at': now})
+                if transcripts:
+                    bulk_insert(StudentTranscript.__table__, TRANSCRIPT_COLUMNS, _transcript_rows(
+                        ids[block].tolist(), exam_fields, marks[block],
+                        (percentage[block], passed[block], status[block], grade[block])),
+                        {'updated_at': now})
+                result_count += count * len(year_exams)
+
+        rebuild_counters()
+    finally:
+        if sqlite:
+            connection.exec_driver_sql(f'PRAGMA cache_size={cache_size}')
+
+    return admin, students, [exam.id for exam in exam_list], result_count
+
+SAMPLE_STUDENTS = [
+    ('2023001', 'ID001', '+1234567890', 'Alice Johnson', 'alice@student.edu', 1, 'A'),
+    ('2023002', 'ID002', '+1234567891', 'Bob Smith', 'bob@student.edu', 1, 'A'),
+    ('2023003', 'ID003', '+1234567892', 'Carol Davis', 'carol@student.edu', 1, 'B'),
+    ('2022001', 'ID004', '+1234567893', 'David Wilson', 'david@student.edu', 2, 'A'),
+    ('2022002', 'ID005', '+1234567894', 'Eva Brown', 'eva@student.edu', 2, 'A'),
+]
+
+SAMPLE_EXAMS = [
+    ('Mid-term Examination', 'mid-term', 1, 1, 'Anatomy', 100.0, 50.0, date(2023, 10, 15)),
+    ('Final Examination', 'final', 1, 1, 'Physiology', 100.0, 50.0, date(2023, 12, 20)),
+    ('Practical Assessment', 'practical', 1, 1, 'Biochemistry', 50.0, 25.0, date(2023, 11, 10)),
+    ('Mid-term Examination', 'mid-term', 2, 3, 'Pathology', 100.0, 50.0, date(2023, 10, 25)),
+]
+
+# (roll number, subject, marks)
+SAMPLE_RESULTS = [
+    ('2023001', 'Anatomy', 85), ('2023002', 'Anatomy', 72), ('2023003', 'Anatomy', 45),
+    ('2023001', 'Physiology', 78), ('2023002', 'Physiology', 68), ('2023003', 'Physiology', 55),
+    ('2023001', 'Biochemistry', 42), ('2023002', 'Biochemistry', 38), ('2023003', 'Biochemistry', 20),
+    ('2022001', 'Pathology', 88), ('2022002', 'Pathology', 75),
+]
+
+def seed_sample_data(username='admin', password='admin123'):
+    """Load the demo students, exams and results in the current transaction.
+
+    Rows that already exist are left alone, so running it twice is harmless.
+    Each table is checked with one query and written with one bulk insert.
+    Returns the admin user.
+    """
+    admin = _admin_user(username, password)
+    now = datetime.utcnow()
+
+    existing = {roll for (roll,) in db.session.query(Student.roll_number)
+                .filter(Student.roll_number.in_([row[0] for row in SAMPLE_STUDENTS]))}
+    bulk_insert(Student.__table__, STUDENT_COLUMNS,
+                [row for row in SAMPLE_STUDENTS if row[0] not in existing], {'created_at': now})
+
+    existing = set(db.session.query(Exam.name, Exam.year, Exam.semester, Exam.subject))
+    bulk_insert(Exam.__table__, EXAM_COLUMNS,
+                [row for row in SAMPLE_EXAMS if (row[0], row[2], row[3], row[4]) not in existing],
+                {'created_at': now})
+
+    students = dict(db.session.query(Student.roll_number, Student.id)
+                    .filter(Student.roll_number.in_([row[0] for row in SAMPLE_STUDENTS])))
+    sample_keys = {(row[0], row[2], row[3], row[4]) for row in SAMPLE_EXAMS}
+    exams = {exam.subject: exam for exam in Exam.query.filter(
+        Exam.subject.in_([row[4] for row in SAMPLE_EXAMS])).order_by(Exam.id)
+        if (exam.name, exam.year, exam.semester, exam.subject) in sample_keys}
+    recorded = set(db.session.query(Result.student_id, Result.exam_id)
+                   .filter(Result.student_id.in_(list(students.values()))))
+    rows = []
+    for roll_number, subject, marks in SAMPLE_RESULTS:
+        exam = exams[subject]
+        if (students[roll_number], exam.id) in recorded:
+            continue
+        graded = grade_result(marks, '', exam)
+        rows.append((students[roll_number], exam.id, float(marks), graded['percentage'],
+                     graded['passed'], graded['grade'], graded['status']))
+    bulk_insert(Result.__table__, RESULT_COLUMNS, rows, {'uploaded_by': admin.id, 'created_at': now})
+
+    refresh_transcripts(students.values())
+    rebuild_counters()
+    return admin
@@ -65,6 +65,63 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     initTableSearch();
 
+    // Exam selects: search all exams through the picker endpoint
+    function initExamPickers() {
+        var selects = document.querySelectorAll('select[data-exam-picker]');
+        selects.forEach(function(select) {
+            var url = select.getAttribute('data-exam-picker');
+            var search = document.createElement('input');
+            search.type = 'search';
+            search.className = 'form-control form-control-sm mb-1';
+            search.placeholder = 'Search exams by name or subject';
+            select.parentNode.insertBefore(search, select);
+
+            var more = document.createElement('button');
+            more.type = 'button';
+            more.className = 'btn btn-link btn-sm px-0 d-none';
+            more.textContent = 'Show more exams';
+            select.parentNode.insertBefore(more, select.nextSibling);
+
+            var nextCursor = null;
+            var timer = null;
+
+            function load(append) {
+                var params = new URLSearchParams({ q: search.value });
+                if (append && nextCursor) {
+                    params.set('cursor', nextCursor);
+                }
+                fetch(url + '?' + params.toString(), { credentials: 'same-origin' })
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        var selected = select.options[select.selectedIndex];
+                        if (!append) {
+                            // Keep the current choice so a search never silently changes it
+                            Array.prototype.slice.call(select.options).forEach(function(option) {
+                                if (option !== selected) {
+                                    select.removeChild(option);
+                                }
+                            });
+                        }
+                        data.results.forEach(function(exam) {
+                            if (selected && String(exam.id) === selected.value) {
+                                return;
+                            }
+                            select.appendChild(new Option(exam.text, exam.id));
+                        });
+                        nextCursor = data.next_cursor;
+                        more.classList.toggle('d-none', !nextCursor);
+                    });
+            }
+
+            search.addEventListener('input', function() {
+                clearTimeout(timer);
+                timer = setTimeout(function() { load(false); }, 250);
+            });
+            more.addEventListener('click', function() { load(true); });
+        });
+    }
+    initExamPickers();
+
     // Animate cards on scroll
     function animateOnScroll() {
         var cards = document.querySelectorAll('.card');
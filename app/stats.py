@@ -0,0 +1,107 @@
+"""
+Materialized exam statistics
+
+Statistics are computed with SQL aggregates and stored in ExamStatistics, one
+row per exam. Any path that writes results for an exam calls
+invalidate_exam_statistics() inside the same transaction, which bumps
+Exam.results_version; the next page view recomputes the row once and every
+later view reads it back.
+
+Each stored row records the version it was computed at and is only used
+while that is still the exam's version. A view that computed its figures
+just before an import committed therefore stores a row that is already
+stale, and the next view replaces it, rather than leaving wrong statistics
+behind for good.
+"""
+
+import json
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.database import use_primary
+from app.models import Exam, Result, ExamStatistics
+
+def statistics_query(exam_id):
+    """Count, pass count and marks figures of exam_id's results in one row"""
+    passed = case((Result.passed.is_(True), 1), else_=0)
+    # Absent students count towards totals but not towards the marks figures
+    present_marks = case((Result.status != 'Absent', Result.marks_obtained))
+    return db.session.query(
+        func.count(Result.id),
+        func.coalesce(func.sum(passed), 0),
+        func.avg(present_marks),
+        func.max(present_marks),
+        func.min(present_marks),
+    ).filter(Result.exam_id == exam_id)
+
+def grade_distribution_query(exam_id):
+    grade = func.coalesce(func.nullif(Result.grade, ''), 'No Grade')
+    return db.session.query(grade, func.count(Result.id))\
+                     .filter(Result.exam_id == exam_id)\
+                     .group_by(grade)
+
+def compute_exam_statistics(exam):
+    """Build an (unsaved) ExamStatistics row for exam using SQL aggregates"""
+    total, passed_count, avg_marks, highest, lowest = statistics_query(exam.id).one()
+    grade_distribution = dict(grade_distribution_query(exam.id).all())
+
+    return ExamStatistics(
+        exam_id=exam.id,
+        total_students=total,
+        passed_students=int(passed_count),
+        avg_marks=avg_marks,
+        highest_marks=highest,
+        lowest_marks=lowest,
+        grade_distribution=json.dumps(grade_distribution)
+    )
+
+def get_exam_statistics(exam):
+    """Return the statistics dict for exam, computing and storing it if needed.
+
+    Returns None when the exam has no results.
+    """
+    row = db.session.get(ExamStatistics, exam.id)
+    if row is None or row.results_version != (exam.results_version or 0):
+        # The stored row must reflect the primary, not a possibly lagging replica.
+        # The version is read before the aggregates, so if a write commits in
+        # between the row is labelled older than its figures, never newer.
+        with use_primary():
+            version = db.session.query(Exam.results_version).filter_by(id=exam.id).scalar() or 0
+            fresh = compute_exam_statistics(exam)
+        fresh.results_version = version
+        if row is not None:
+            db.session.expunge(row)
+        db.session.query(ExamStatistics)\
+                  .filter(ExamStatistics.exam_id == exam.id,
+                          or_(ExamStatistics.results_version.is_(None),
+                              ExamStatistics.results_version < version))\
+                  .delete(synchronize_session=False)
+        db.session.add(fresh)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request stored this version (or a newer one) first
+            db.session.rollback()
+        row = fresh
+
+    if not row.total_students:
+        return None
+
+    total_students = row.total_students
+    passed_students = row.passed_students
+    return {
+        'total_students': total_students,
+        'passed_students': passed_students,
+        'failed_students': total_students - passed_students,
+        'pass_percentage': round(passed_students / total_students * 100, 2),
+        'avg_marks': round(row.avg_marks or 0, 2),
+        'highest_marks': row.highest_marks or 0,
+        'lowest_marks': row.lowest_marks or 0,
+        'grade_distribution': json.loads(row.grade_distribution)
+    }
+
+def invalidate_exam_statistics(exam_id):
+    """Mark the materialized statistics for exam_id stale in the current transaction"""
+    db.session.query(Exam).filter_by(id=exam_id)\
+              .update({Exam.results_version: func.coalesce(Exam.results_version, 0) + 1},
+                      synchronize_session=False)
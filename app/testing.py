@@ -0,0 +1,69 @@
+"""
+Query-count helpers for tests
+
+Typical use: render a page, add more results, render it again, and fail if
+the second render issued more SQL statements than the first::
+
+    assert_constant_queries(
+        lambda: client.post('/lookup_results', data=credentials),
+        lambda: add_results_for(student, count=20))
+"""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+class QueryCounter:
+    """Context manager that records SQL statements executed on an engine.
+
+    parameters holds each statement's parameters in step with statements: a
+    list of parameter sets for an executemany, otherwise a single set.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+        self.parameters = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the wrapped block executes more than limit SQL statements"""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f'Expected at most {limit} queries, got {counter.count}:\n'
+            + '\n'.join(counter.statements))
+
+def assert_constant_queries(request, grow, engine=None):
+    """Fail if request() issues more queries after grow() adds more rows.
+
+    Catches N+1 patterns: a page whose query count depends on how many
+    results it renders.
+    """
+    with QueryCounter(engine) as before:
+        request()
+    grow()
+    with QueryCounter(engine) as after:
+        request()
+    if after.count > before.count:
+        raise AssertionError(
+            f'Query count grew from {before.count} to {after.count} as rows were added:\n'
+            + '\n'.join(after.statements))
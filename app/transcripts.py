@@ -0,0 +1,106 @@
+"""
+Denormalized per-student transcripts
+
+StudentTranscript keeps one row per student holding their results already
+joined to the exam columns the results page shows, in display order, plus
+total/passed counts, the average percentage and a grade point average
+(GRADE_POINTS). Every path that writes results calls refresh_transcripts()
+inside the same transaction, so a lookup reads a single row instead of
+joining Result to Exam and counting in the template.
+"""
+
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import contains_eager
+from app import db
+from app.models import Result, Exam, StudentTranscript
+
+def result_row(result):
+    """The fields of result the results page shows, as a plain dict"""
+    return {
+        'exam_name': result.exam.name,
+        'subject': result.exam.subject,
+        'year': result.exam.year,
+        'semester': result.exam.semester,
+        'total_marks': result.exam.total_marks,
+        'marks_obtained': result.marks_obtained,
+        'percentage': result.percentage,
+        'grade': result.grade,
+        'status': result.status,
+        'is_pass': result.is_pass,
+    }
+
+def summarize(rows):
+    """Counts, average percentage and grade point average for transcript rows"""
+    points = current_app.config['GRADE_POINTS']
+    present = [row for row in rows if row['status'] != 'Absent']
+    graded = [points[row['grade']] for row in present if row['grade'] in points]
+    return {
+        'result_count': len(rows),
+        'passed_count': sum(1 for row in rows if row['is_pass']),
+        'average_percentage': sum(row['percentage'] for row in present) / len(present) if present else None,
+        'grade_point_average': round(sum(graded) / len(graded), 2) if graded else None,
+    }
+
+def transcript_result_query(student_ids):
+    """Results of student_ids with their exams, in transcript order"""
+    # contains_eager fills result.exam from the join, so the exam columns
+    # never trigger a per-row SELECT
+    return Result.query.join(Result.exam).options(contains_eager(Result.exam))\
+                 .filter(Result.student_id.in_(student_ids))\
+                 .order_by(Result.student_id, Exam.year, Exam.semester, Exam.name)
+
+def stored_transcript_query(student_ids):
+    return StudentTranscript.query.filter(StudentTranscript.student_id.in_(student_ids))
+
+def build_transcripts(student_ids):
+    """Ordered result rows per student, read from Result and Exam with one query"""
+    transcripts = {student_id: [] for student_id in student_ids}
+    if not transcripts:
+        return transcripts
+    for result in transcript_result_query(list(transcripts)):
+        transcripts[result.student_id].append(result_row(result))
+    return transcripts
+
+def refresh_transcripts(student_ids, batch_size=500):
+    """Rebuild the stored transcripts of student_ids in the current transaction"""
+    student_ids = sorted(set(student_ids))
+    now = datetime.utcnow()
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        transcripts = build_transcripts(batch)
+        db.session.execute(delete(StudentTranscript).where(StudentTranscript.student_id.in_(batch)),
+                           execution_options={'synchronize_session': False})
+        db.session.execute(insert(StudentTranscript), [
+            {'student_id': student_id, 'results': json.dumps(rows), 'updated_at': now, **summarize(rows)}
+            for student_id, rows in transcripts.items()
+        ])
+
+def _transcript_entry(rows, summary):
+    total = summary['result_count']
+    return {
+        'results': rows,
+        'summary': dict(summary, pass_rate=summary['passed_count'] / total * 100 if total else 0),
+    }
+
+def load_transcripts(student_ids):
+    """{student_id: {'results': [...], 'summary': {...}}} from the stored rows.
+
+    Students without a stored transcript yet (data imported before the table
+    existed) are built from Result on the fly but not saved, since this may
+    be running against a read-only replica.
+    """
+    entries = {}
+    for transcript in stored_transcript_query(list(student_ids)):
+        entries[transcript.student_id] = _transcript_entry(json.loads(transcript.results), {
+            'result_count': transcript.result_count,
+            'passed_count': transcript.passed_count,
+            'average_percentage': transcript.average_percentage,
+            'grade_point_average': transcript.grade_point_average,
+        })
+    missing = [student_id for student_id in student_ids if student_id not in entries]
+    for student_id, rows in build_transcripts(missing).items():
+        entries[student_id] = _transcript_entry(rows, summarize(rows))
+    return entries
@@ -0,0 +1,98 @@
+"""
+Queued file uploads shared by result sheets and student rosters
+
+An upload is recorded (ResultUpload or RosterUpload) as soon as the form is
+accepted, its file is handed to the job runner, and the admin's page polls a
+JSON progress endpoint while the job commits chunk by chunk. Both kinds of
+upload share the same bookkeeping columns, so one set of helpers serves them.
+"""
+
+import os
+from flask import current_app, jsonify
+from flask_login import current_user
+from werkzeug.utils import secure_filename
+from app import db, jobs
+from app.database import stick_to_primary
+
+def queue_upload(model, file, job, spool_prefix='', **fields):
+    """Record an upload of file as a new model row and queue job(upload_id, source).
+
+    fields are extra columns for the row (such as exam_id and mode). Returns
+    the committed row.
+    """
+    filename = secure_filename(file.filename)
+    # Record the upload straight away so its progress can be polled
+    upload = model(filename=filename, uploaded_by=current_user.id, total_records=0,
+                   successful_records=0, failed_records=0, updated_records=0,
+                   status='Processing', **fields)
+    db.session.add(upload)
+    db.session.commit()
+
+    if current_app.config['JOBS_RUN_INLINE']:
+        # Processed within this request, so read straight from the upload stream
+        jobs.submit(job, upload.id, file.stream)
+    else:
+        # The request stream is gone once we return, so spool it to disk.
+        # Prefix with the upload id so concurrent uploads never share a file
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'],
+                                 f"{spool_prefix}{upload.id}_{filename}")
+        file.save(file_path)
+        jobs.submit(job, upload.id, file_path)
+    return upload
+
+def record_upload_progress(upload, success_count, errors, updated_count=0):
+    """Store running totals on upload and commit them"""
+    upload.total_records = success_count + len(errors)
+    upload.successful_records = success_count
+    upload.failed_records = len(errors)
+    upload.updated_records = updated_count
+    upload.error_log = '\n'.join(errors) if errors else None
+    db.session.commit()
+
+def run_upload(model, upload_id, source, importer):
+    """Body of an upload job: run importer and record the outcome on the upload.
+
+    importer(upload, source, progress) returns (success_count, error_count,
+    errors, updated_count) and calls progress(success_count, errors,
+    updated_count) after each commit. If it raises, whatever it had already
+    committed is kept and the upload is marked Failed. source is either the
+    path of a spooled copy of the upload, which is removed afterwards, or
+    the upload stream itself.
+    """
+    upload = db.session.get(model, upload_id)
+    # Chunks commit independently, so remember what has already been saved
+    committed = {'success_count': 0, 'errors': [], 'updated_count': 0}
+
+    def progress(success_count, errors, updated_count=0):
+        committed.update(success_count=success_count, errors=list(errors), updated_count=updated_count)
+        record_upload_progress(upload, success_count, errors, updated_count)
+
+    try:
+        success_count, error_count, errors, updated_count = importer(upload, source, progress)
+        upload.status = 'Completed' if error_count == 0 else 'Completed with errors'
+    except Exception as e:
+        db.session.rollback()
+        success_count, updated_count = committed['success_count'], committed['updated_count']
+        errors = committed['errors'] + [f"File processing error: {str(e)}"]
+        upload.status = 'Failed'
+    finally:
+        if isinstance(source, str):
+            os.remove(source)
+    record_upload_progress(upload, success_count, errors, updated_count)
+
+def upload_progress_response(model, upload_id):
+    """JSON progress of a queued upload of model"""
+    upload = db.get_or_404(model, upload_id)
+    # Rows are still being committed by the job; keep this admin's reads on the primary
+    stick_to_primary()
+    return jsonify({
+        'id': upload.id,
+        'filename': upload.filename,
+        'status': upload.status,
+        'finished': upload.status != 'Processing',
+        'total_records': upload.total_records,
+        'successful_records': upload.successful_records,
+        'failed_records': upload.failed_records,
+        'updated_records': upload.updated_records or 0,
+        'errors': upload.error_log.splitlines()[:20] if upload.error_log else []
+    })
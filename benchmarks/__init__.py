@@ -0,0 +1,3 @@
+"""
+Result-publication-day benchmarks for University Result Portal
+"""
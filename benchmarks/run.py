@@ -0,0 +1,214 @@
+"""
+Load-test the portal the way result-publication day does
+
+Seeds a throwaway SQLite database with synthetic data, then drives the real
+Flask application through its test client from several threads at once:
+
+- lookup:     concurrent student result lookups (POST /lookup_results)
+- statistics: exam statistics page views
+- by_exam:    paginated exam result listings
+- upload:     large result sheet imports through /admin/upload_results
+
+Latency percentiles and throughput are printed (or written) as JSON so that
+runs on different commits can be compared directly.
+
+Usage:
+    python -m benchmarks.run --students 5000 --exams 20 --requests 2000 --output bench.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app, db
+from app.models import Exam
+from app.pagination import encode_cursor
+from app.seed import generate_dataset, student_credentials
+
+SCENARIOS = ('lookup', 'statistics', 'by_exam', 'upload')
+
+def make_config(database_path):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+        WTF_CSRF_ENABLED = False
+        # Time the whole import inside the upload request
+        JOBS_RUN_INLINE = True
+        BCRYPT_LOG_ROUNDS = 4
+        # Every simulated client shares one address, so per-IP limits would cap throughput
+        RATELIMIT_ENABLED = False
+    return BenchmarkConfig
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies, errors, wall_seconds):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'wall_seconds': round(wall_seconds, 4),
+        'throughput_rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+def run_concurrently(app, total_requests, concurrency, make_request, login=False):
+    """Spread total_requests over concurrency threads, each with its own client"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(worker_id, count):
+        client = app.test_client()
+        if login:
+            client.post('/auth/login', data={'username': 'benchadmin', 'password': 'benchpass'})
+        rng = random.Random(worker_id)
+        local = []
+        failed = 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = make_request(client, rng)
+            local.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    per_thread = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(i, count)) for i, count in enumerate(per_thread) if count]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+def upload_sheet(students, rows, seed):
+    """A CSV result sheet with rows entries for existing students"""
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    buffer.write('roll_number,marks_obtained,grade,status,remarks\n')
+    for index in rng.sample(range(students), min(rows, students)):
+        marks = rng.randint(0, 100)
+        buffer.write(f'{student_credentials(index)[0]},{marks},,{"Pass" if marks >= 50 else "Fail"},\n')
+    return buffer.getvalue().encode()
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--exams', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per read scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--uploads', type=int, default=3, help='number of sheets to import')
+    parser.add_argument('--upload-rows', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='result-bench-')
+    app = create_app(make_config(os.path.join(workdir, 'bench.db')))
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        _, students, exam_ids, result_count = generate_dataset(args.students, args.exams, args.seed)
+        db.session.commit()
+        seed_seconds = time.perf_counter() - started
+
+    def lookup(client, rng):
+        roll_number, id_card_number, phone_number = student_credentials(rng.randrange(students))
+        credentials = {'roll_number': roll_number}
+        if rng.random() < 0.5:
+            credentials['id_card_number'] = id_card_number
+        else:
+            credentials['phone_number'] = phone_number
+        return client.post('/lookup_results', data=credentials)
+
+    def statistics(client, rng):
+        return client.get(f'/results/statistics/{rng.choice(exam_ids)}')
+
+    # Keyset cursors starting at random roll numbers stand in for deep pages
+    with app.test_request_context():
+        cursors = [encode_cursor('next', [student_credentials(index)[0]])
+                   for index in random.Random(args.seed).sample(range(students), min(students, 200))]
+
+    def by_exam(client, rng):
+        return client.get(f'/results/by_exam/{rng.choice(exam_ids)}',
+                          query_string={'cursor': rng.choice(cursors)})
+
+    upload_counter = iter(range(args.uploads))
+
+    def upload(client, rng):
+        number = next(upload_counter)
+        with app.app_context():
+            exam = Exam(name=f'Benchmark Upload {number}', exam_type='final', year=1, semester=1,
+                        subject='Benchmark', total_marks=100, passing_marks=50)
+            db.session.add(exam)
+            db.session.commit()
+            exam_id = exam.id
+        sheet = upload_sheet(students, args.upload_rows, args.seed + number)
+        return client.post('/admin/upload_results', content_type='multipart/form-data',
+                           data={'exam_id': exam_id, 'file': (io.BytesIO(sheet), f'bench_{number}.csv')})
+
+    scenarios = {
+        'lookup': lambda: run_concurrently(app, args.requests, args.concurrency, lookup),
+        'statistics': lambda: run_concurrently(app, args.requests, args.concurrency, statistics),
+        'by_exam': lambda: run_concurrently(app, args.requests, args.concurrency, by_exam),
+        'upload': lambda: run_concurrently(app, args.uploads, min(args.concurrency, args.uploads),
+                                           upload, login=True),
+    }
+
+    report = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'dataset': {
+            'students': students,
+            'exams': len(exam_ids),
+            'results': result_count,
+            'seed_seconds': round(seed_seconds, 3),
+        },
+        'scenarios': {},
+    }
+    for name in args.scenarios.split(','):
+        report['scenarios'][name] = scenarios[name.strip()]()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
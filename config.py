@@ -14,23 +14,77 @@ class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///university_results.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')  # read-only copy for public pages
+    DATABASE_REPLICA_BLUEPRINTS = ('main', 'results')
+    SQLITE_READ_ONLY_BIND = os.environ.get('SQLITE_READ_ONLY_BIND', 'true').lower() in ['true', 'on', '1']  # mode=ro pool when there is no replica
+    DATABASE_READ_YOUR_WRITES_SECONDS = int(os.environ.get('DATABASE_READ_YOUR_WRITES_SECONDS') or 30)  # 0 disables
+    
+    # Connection pool (server databases only)
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 10)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 20)
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE') or 1800)  # seconds
+    DATABASE_POOL_PRE_PING = os.environ.get('DATABASE_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1']
+    
+    # SQLite pragmas (applied to every new connection)
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() in ['true', 'on', '1']
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024)  # bytes
     
     # Security settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS') or 12)  # stored hashes are upgraded on login
+    PASSWORD_CHECK_WORKERS = int(os.environ.get('PASSWORD_CHECK_WORKERS') or 2)  # concurrent bcrypt computations
+    PASSWORD_CHECK_QUEUE = int(os.environ.get('PASSWORD_CHECK_QUEUE') or 16)  # checks allowed to wait before logins get a 503
+    PASSWORD_CHECK_TIMEOUT = float(os.environ.get('PASSWORD_CHECK_TIMEOUT') or 10)  # seconds
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)  # seconds a logged-in admin is served without a SELECT, 0 disables
     
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 500)  # rows per set-based batch
+    WORKBOOK_PROCESSES = int(os.environ.get('WORKBOOK_PROCESSES') or 0)  # sheet parsers; 0 = min(4, CPUs)
+    PUBLISHED_RESULTS_FOLDER = os.environ.get('PUBLISHED_RESULTS_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'published')
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 1000)  # rows fetched per round trip
+    
+    # Background jobs (result imports run off the request thread)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOBS_RUN_INLINE = False
+    
+    # Caching (set CACHE_DIR to share caches between worker processes)
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    LOOKUP_CACHE_SIZE = int(os.environ.get('LOOKUP_CACHE_SIZE') or 10000)  # students per worker
+    LOOKUP_CACHE_TTL = int(os.environ.get('LOOKUP_CACHE_TTL') or 300)  # seconds
+    PAGINATION_COUNT_TTL = int(os.environ.get('PAGINATION_COUNT_TTL') or 60)  # seconds listing totals are reused
+    EXAM_CHOICES_TTL = int(os.environ.get('EXAM_CHOICES_TTL') or 300)  # seconds; other workers see new exams within this without CACHE_DIR
+    EXAM_CHOICES_INITIAL = int(os.environ.get('EXAM_CHOICES_INITIAL') or 50)  # exams rendered in a select before searching
+    
+    # Instrumentation (per-endpoint latency and SQL figures at /admin/metrics)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 500)
+    
+    # Student lookup protection
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    LOOKUP_IP_LIMIT = int(os.environ.get('LOOKUP_IP_LIMIT') or 30)  # lookups per minute per client IP
+    LOOKUP_ROLL_LIMIT = int(os.environ.get('LOOKUP_ROLL_LIMIT') or 10)  # failed lookups per minute per roll number
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES') or 0)  # reverse proxies in front of the app; the client IP comes from X-Forwarded-For
+    LOOKUP_NEGATIVE_CACHE_TTL = int(os.environ.get('LOOKUP_NEGATIVE_CACHE_TTL') or 60)  # seconds
+    CREDENTIAL_INDEX_ENABLED = os.environ.get('CREDENTIAL_INDEX_ENABLED', 'false').lower() in ['true', 'on', '1']
+    CREDENTIAL_INDEX_REFRESH = int(os.environ.get('CREDENTIAL_INDEX_REFRESH') or 600)  # seconds between rebuilds, 0 never
     
     # University specific settings
     UNIVERSITY_NAME = "Medical University"
     PROGRAM_NAME = "MBBS"
     PROGRAM_DURATION = 5  # years
     
+    # Grading: (minimum percentage, grade), best first; the last grade is the failing grade
+    GRADE_BOUNDARIES = [(90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (55, 'C+'), (50, 'C'), (45, 'D'), (0, 'F')]
+    GRADE_POINTS = {'A+': 4.0, 'A': 4.0, 'B+': 3.5, 'B': 3.0, 'C+': 2.5, 'C': 2.0, 'D': 1.0, 'F': 0.0}  # transcript GPA
+    
     # Email configuration (for future notifications)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -52,6 +106,9 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    JOBS_RUN_INLINE = True
+    RATELIMIT_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,55 @@
+"""
+Shared fixtures: a fresh application on an in-memory database per test
+"""
+
+import pandas as pd
+import pytest
+from config import TestingConfig
+from app import create_app, db
+from app.imports import import_result_chunks
+from app.models import User, Student, Exam
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin(app):
+    user = User(username='admin', email='admin@university.edu', is_admin=True)
+    user.set_password('admin123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def make_students(count, year=1, start=0):
+    """Add and commit count students; roll numbers R00000, R00001, ..."""
+    students = [Student(roll_number=f'R{index:05d}', id_card_number=f'ID{index:05d}',
+                        phone_number=f'0300{index:07d}', name=f'Student {index}', year=year)
+                for index in range(start, start + count)]
+    db.session.add_all(students)
+    db.session.commit()
+    return students
+
+def make_exam(subject='Anatomy', year=1, semester=1, total_marks=100.0):
+    exam = Exam(name=f'{subject} Final', exam_type='final', year=year, semester=semester,
+                subject=subject, total_marks=total_marks, passing_marks=total_marks / 2)
+    db.session.add(exam)
+    db.session.commit()
+    return exam
+
+def add_results(exam, students, user, marks=65):
+    """Write results through the import path, as an upload would"""
+    frame = pd.DataFrame({'roll_number': [student.roll_number for student in students],
+                          'marks_obtained': [marks] * len(students)})
+    success, error_count, errors, _ = import_result_chunks([frame], exam.id, user.id)
+    assert error_count == 0, errors
+    return success
@@ -0,0 +1,80 @@
+"""
+A correction (upsert) upload writes only the rows that differ from what is stored
+"""
+
+import io
+import pandas as pd
+from app import db
+from app.admin.routes import run_result_upload
+from app.models import Result, ResultChange, ResultUpload
+from app.testing import QueryCounter
+from tests.conftest import make_students, make_exam, add_results
+
+def upload_sheet(exam, user, rows, mode):
+    """Run a result upload of rows (roll_number, marks, remarks) inline; return the upload"""
+    upload = ResultUpload(filename='corrections.csv', exam_id=exam.id, uploaded_by=user.id, total_records=0,
+                          successful_records=0, failed_records=0, updated_records=0, mode=mode)
+    db.session.add(upload)
+    db.session.commit()
+    frame = pd.DataFrame(rows, columns=['roll_number', 'marks_obtained', 'remarks'])
+    run_result_upload(upload.id, io.BytesIO(frame.to_csv(index=False).encode()))
+    return db.session.get(ResultUpload, upload.id)
+
+def writes_to(counter, table):
+    """Rows written to table by INSERT/UPDATE statements, counting every executemany set"""
+    rows = 0
+    for statement, parameters in zip(counter.statements, counter.parameters):
+        if statement.startswith(('INSERT', 'UPDATE')) and f' {table} ' in f'{statement} ':
+            rows += len(parameters) if isinstance(parameters, list) else 1
+    return rows
+
+def test_upsert_writes_only_changed_rows(app, admin):
+    exam = make_exam()
+    students = make_students(200)
+    add_results(exam, students, admin, marks=65)
+    before = {result.student_id: (result.marks_obtained, result.grade, result.remarks)
+              for result in Result.query}
+
+    rows = [(student.roll_number, 65, '') for student in students]
+    rows[3] = (students[3].roll_number, 80, '')
+    rows[50] = (students[50].roll_number, 30, '')
+    rows[120] = (students[120].roll_number, 65, 'Rechecked')
+    changed = {students[3].id: 80.0, students[50].id: 30.0, students[120].id: 65.0}
+
+    with QueryCounter() as counter:
+        upload = upload_sheet(exam, admin, rows, mode='upsert')
+
+    assert (upload.status, upload.successful_records, upload.failed_records) == ('Completed', 200, 0)
+    assert upload.updated_records == 3
+
+    # One executemany UPDATE carrying only the three corrected rows
+    assert sum(statement.startswith('UPDATE result ') for statement in counter.statements) == 1
+    assert writes_to(counter, 'result') == 3
+    assert writes_to(counter, 'result_change') == 3
+
+    after = {result.student_id: (result.marks_obtained, result.grade, result.remarks)
+             for result in Result.query}
+    assert {student_id for student_id in after if after[student_id] != before[student_id]} == set(changed)
+    assert after[students[3].id][0] == 80.0 and after[students[50].id][0] == 30.0
+    assert after[students[120].id][2] == 'Rechecked'
+
+    logged = {change.student_id: change for change in ResultChange.query.filter_by(upload_id=upload.id)}
+    assert set(logged) == set(changed)
+    assert (logged[students[3].id].old_marks, logged[students[3].id].new_marks) == (65.0, 80.0)
+    assert (logged[students[50].id].old_grade, logged[students[50].id].new_grade) == \
+        (before[students[50].id][1], after[students[50].id][1])
+    assert (logged[students[120].id].old_remarks, logged[students[120].id].new_remarks) == (None, 'Rechecked')
+    assert all(change.changed_by == admin.id for change in logged.values())
+
+def test_unchanged_upsert_writes_nothing(app, admin):
+    exam = make_exam()
+    students = make_students(20)
+    add_results(exam, students, admin, marks=65)
+
+    with QueryCounter() as counter:
+        upload = upload_sheet(exam, admin, [(student.roll_number, 65, '') for student in students], mode='upsert')
+
+    assert (upload.status, upload.successful_records, upload.updated_records) == ('Completed', 20, 0)
+    assert writes_to(counter, 'result') == 0
+    assert writes_to(counter, 'result_change') == 0
+    assert ResultChange.query.count() == 0
@@ -0,0 +1,35 @@
+"""
+Dashboard counters rebuilt over existing rows
+"""
+
+from app import db
+from app.counters import BUILT, bump_counters, dashboard_counters, rebuild_counters
+from app.models import Counter
+from tests.conftest import make_students, make_exam, add_results
+
+def test_rebuild_overwrites_existing_counters(app, admin):
+    exam = make_exam(year=2)
+    students = make_students(3)
+    add_results(exam, students[:2], admin)
+    bump_counters({'students': 40, 'results:exam:999': 5})
+    db.session.commit()
+
+    rebuild_counters()
+    totals = rebuild_counters()
+    db.session.commit()
+
+    stored = dict(db.session.query(Counter.name, Counter.value))
+    assert stored == totals
+    assert (stored['students'], stored['results'], stored[f'results:exam:{exam.id}']) == (3, 2, 2)
+    assert stored['results:year:2'] == 2
+    assert 'results:exam:999' not in stored
+
+def test_dashboard_builds_missing_counters_once(app, admin):
+    make_students(2)
+    db.session.query(Counter).delete()
+    db.session.commit()
+
+    counters = dashboard_counters()
+
+    assert counters['students'] == 2 and counters[BUILT] == 1
+    assert dashboard_counters() == counters
@@ -0,0 +1,67 @@
+"""
+The credential index never makes a lookup wait, and loses no changes to a rebuild
+"""
+
+import threading
+import time
+from config import TestingConfig
+from app import create_app, db
+from app.credentials import CredentialIndex, index_students, indexed_student_id, refresh_credential_index
+from tests.conftest import make_students
+
+class IndexConfig(TestingConfig):
+    CREDENTIAL_INDEX_ENABLED = True
+
+def test_changes_during_a_build_are_replayed():
+    index = CredentialIndex()
+
+    def rows():
+        # The snapshot has been read; these changes happen before the swap
+        yield (1, 'R1', 'ID1', 'P1')
+        index.remove('R1', 'ID1', 'P1')
+        index.add(1, 'R1', 'ID9', 'P9')
+        index.add(2, 'R2', 'ID2', 'P2')
+
+    index.build(rows())
+    assert index.get('R1', id_card_number='ID1') is None
+    assert index.get('R1', id_card_number='ID9') == 1
+    assert index.get('R2', phone_number='P2') == 2
+
+def test_indexing_does_not_wait_for_a_rebuild(app):
+    index = app.extensions['credential_index'] = CredentialIndex()
+    index.build([])
+    index.build_lock.acquire()
+    try:
+        started = time.monotonic()
+        index_students([(1, 'R1', 'ID1', 'P1')])
+        assert time.monotonic() - started < 0.5
+    finally:
+        index.build_lock.release()
+    assert index.get('R1', id_card_number='ID1') == 1
+
+def test_rebuild_runs_off_the_job_runner(app):
+    app.config['JOBS_RUN_INLINE'] = False
+    make_students(3)
+    index = CredentialIndex()
+    refresh_credential_index(index)
+    with index.build_lock:
+        pass
+    assert len(index) == 6
+    assert not any(thread.name.startswith('result-jobs') for thread in threading.enumerate())
+
+def test_failed_startup_build_is_retried(monkeypatch):
+    # Tables do not exist yet when create_app builds the index
+    app = create_app(IndexConfig)
+    index = app.extensions['credential_index']
+    assert index.build_failed and index.built_at is None
+    assert not index.is_stale(IndexConfig.CREDENTIAL_INDEX_REFRESH)
+
+    with app.app_context():
+        db.create_all()
+        make_students(2)
+        monkeypatch.setattr('app.credentials.RETRY_AFTER', 0)
+        assert index.is_stale(IndexConfig.CREDENTIAL_INDEX_REFRESH)
+        assert indexed_student_id('R00001', 'ID00001', None) is not None
+        assert not index.build_failed
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,64 @@
+"""
+Grade boundaries, and regrade_exam agreeing with grade_frame
+"""
+
+import pandas as pd
+import pytest
+from app import db
+from app.grading import grade_frame, regrade_exam
+from app.models import Result
+from tests.conftest import make_students, make_exam
+
+def grade_one(marks, status='', total_marks=100.0, passing_marks=50.0):
+    frame = pd.DataFrame({'marks_obtained': [marks], 'status': [status]})
+    row = grade_frame(frame, total_marks, passing_marks).iloc[0]
+    return float(row.percentage), bool(row.passed), row.status, row.grade
+
+def test_exactly_passing_marks_pass(app):
+    assert grade_one(50) == (50.0, True, 'Pass', 'C')
+
+def test_just_below_passing_marks_fail(app):
+    assert grade_one(49.5) == (49.5, False, 'Fail', 'F')
+
+def test_passing_below_the_lowest_passing_grade_gets_that_grade(app):
+    # 42% passes an exam with passing marks of 40, though D starts at 45%
+    assert grade_one(42, passing_marks=40) == (42.0, True, 'Pass', 'D')
+
+def test_grade_boundary_is_inclusive(app):
+    assert grade_one(90)[3] == 'A+'
+    assert grade_one(89.99)[3] == 'A'
+
+@pytest.mark.parametrize('status', ['Absent', 'absent', ' ABSENT '])
+def test_absent_has_no_grade_whatever_the_marks(app, status):
+    assert grade_one(95, status) == (95.0, False, 'Absent', None)
+
+def test_status_other_than_absent_is_ignored(app):
+    assert grade_one(30, 'Pass') == (30.0, False, 'Fail', 'F')
+
+def test_zero_total_marks(app):
+    assert grade_one(0, total_marks=0, passing_marks=0) == (0.0, True, 'Pass', 'D')
+    assert grade_one(0, 'Absent', total_marks=0, passing_marks=0) == (0.0, False, 'Absent', None)
+
+@pytest.mark.parametrize('total_marks, passing_marks', [(100.0, 50.0), (75.0, 30.0), (0.0, 0.0)])
+def test_regrade_exam_matches_grade_frame(app, admin, total_marks, passing_marks):
+    exam = make_exam(total_marks=total_marks)
+    exam.passing_marks = passing_marks
+    marks = [0, 22.5, 29.99, 30, 37.5, 49.99, 50, 60, 67.5, 75, 95]
+    statuses = ['', 'Absent', ' absent ', 'ABSENT', 'Pass', 'Fail']
+    inputs = [(m, status) for m in marks for status in statuses]
+    students = make_students(len(inputs))
+    db.session.add_all(Result(student_id=student.id, exam_id=exam.id, marks_obtained=m, status=status,
+                              grade='?', percentage=-1, passed=None, uploaded_by=admin.id)
+                       for student, (m, status) in zip(students, inputs))
+    db.session.commit()
+
+    regrade_exam(exam)
+    db.session.commit()
+
+    expected = grade_frame(pd.DataFrame(inputs, columns=['marks_obtained', 'status']),
+                           total_marks, passing_marks)
+    stored = {result.student_id: result for result in Result.query.filter_by(exam_id=exam.id)}
+    for student, row in zip(students, expected.itertuples(index=False)):
+        result = stored[student.id]
+        assert (result.percentage, result.passed, result.status, result.grade) == \
+            (pytest.approx(row.percentage), bool(row.passed), row.status, row.grade), (row.marks_obtained, row.status)
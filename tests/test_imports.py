@@ -0,0 +1,115 @@
+"""
+Result sheet imports report the same per-row errors as the old row-by-row importer
+
+The expected messages are the ones the original loop produced: the
+KeyError text for a missing column, float()'s message for marks it could
+not parse, and "Row N" counting data rows from 1 in sheet order.
+"""
+
+import pandas as pd
+import pytest
+from flask import current_app
+from openpyxl import Workbook
+from app.imports import iter_result_file_chunks, import_result_chunks
+from app.models import Result
+from tests.conftest import make_students, make_exam, add_results
+
+def write_csv(path, rows, columns=('roll_number', 'marks_obtained')):
+    pd.DataFrame(rows, columns=list(columns)).to_csv(path, index=False)
+    return str(path)
+
+def write_xlsx(path, rows, columns=('roll_number', 'marks_obtained')):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(columns))
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+    return str(path)
+
+def import_sheet(path, exam_id, user_id):
+    """Stream path through the chunked importer, as an upload job does"""
+    chunks = iter_result_file_chunks(path, path, current_app.config['IMPORT_CHUNK_SIZE'])
+    return import_result_chunks(chunks, exam_id, user_id)
+
+@pytest.fixture(params=['csv', 'xlsx'])
+def sheet(request, tmp_path):
+    """Write rows as a CSV or XLSX file and return its path"""
+    writer = write_csv if request.param == 'csv' else write_xlsx
+    return lambda rows, **kwargs: writer(tmp_path / f'results.{request.param}', rows, **kwargs)
+
+def test_missing_column_is_reported_on_every_row(app, admin, sheet):
+    exam = make_exam()
+    make_students(2)
+    path = sheet([('R00000',), ('R00001',)], columns=('roll_number',))
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (0, 2)
+    assert errors == ["Row 1: 'marks_obtained'", "Row 2: 'marks_obtained'"]
+
+def test_unparseable_marks(app, admin, sheet):
+    exam = make_exam()
+    make_students(2)
+    path = sheet([('R00000', 'absent'), ('R00001', 70)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (1, 1)
+    assert errors == ["Row 1: could not convert string to float: 'absent'"]
+
+def test_unknown_roll_number(app, admin, sheet):
+    exam = make_exam()
+    make_students(1)
+    path = sheet([('R00000', 55), ('R99999', 60)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (1, 1)
+    assert errors == ['Row 2: Student with roll number R99999 not found']
+
+def test_duplicate_row_in_sheet(app, admin, sheet):
+    exam = make_exam()
+    make_students(1)
+    path = sheet([('R00000', 55), ('R00000', 60)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (1, 1)
+    assert errors == ['Row 2: Result already exists for R00000']
+    assert Result.query.one().marks_obtained == 55
+
+def test_existing_result(app, admin, sheet):
+    exam = make_exam()
+    students = make_students(2)
+    add_results(exam, students[:1], admin)
+    path = sheet([('R00000', 80), ('R00001', 60)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (1, 1)
+    assert errors == ['Row 1: Result already exists for R00000']
+
+def test_row_numbers_continue_across_chunks_in_sheet_order(app, admin, sheet):
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    exam = make_exam()
+    make_students(3)
+    path = sheet([('R00000', 50), ('R99990', 50), ('R00001', 'x'),
+                  ('R00002', 50), ('R99991', 50)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (2, 3)
+    assert errors == ['Row 2: Student with roll number R99990 not found',
+                      "Row 3: could not convert string to float: 'x'",
+                      'Row 5: Student with roll number R99991 not found']
+
+def test_blank_xlsx_rows_keep_later_row_numbers(app, admin, tmp_path):
+    exam = make_exam()
+    make_students(1)
+    path = write_xlsx(tmp_path / 'results.xlsx', [('R00000', 50), (None, None), ('R99999', 50)])
+
+    success, error_count, errors, _ = import_sheet(path, exam.id, admin.id)
+
+    assert (success, error_count) == (1, 1)
+    assert errors == ['Row 3: Student with roll number R99999 not found']
@@ -0,0 +1,44 @@
+"""
+Pages must issue the same number of queries however many results they show
+"""
+
+from app.testing import assert_constant_queries
+from tests.conftest import make_students, make_exam, add_results
+
+def test_lookup_results_queries_do_not_grow_with_results(app, client, admin):
+    student, = make_students(1)
+    add_results(make_exam('Anatomy'), [student], admin)
+    credentials = {'roll_number': student.roll_number, 'id_card_number': student.id_card_number}
+
+    def lookup():
+        response = client.post('/lookup_results', data=credentials)
+        assert response.status_code == 200
+        assert b'Anatomy' in response.data
+
+    def grow():
+        for subject in ('Physiology', 'Biochemistry', 'Pathology', 'Pharmacology'):
+            add_results(make_exam(subject), [student], admin)
+
+    assert_constant_queries(lookup, grow)
+
+def test_by_exam_queries_do_not_grow_with_results(app, client, admin):
+    exam = make_exam()
+    students = make_students(30)
+    add_results(exam, students[:5], admin)
+
+    def view():
+        assert client.get(f'/results/by_exam/{exam.id}').status_code == 200
+
+    assert_constant_queries(view, lambda: add_results(exam, students[5:], admin))
+
+def test_statistics_queries_do_not_grow_with_results(app, client, admin):
+    exam = make_exam()
+    students = make_students(30)
+    add_results(exam, students[:5], admin)
+
+    def view():
+        response = client.get(f'/results/statistics/{exam.id}')
+        assert response.status_code == 200
+        assert b'No results' not in response.data
+
+    assert_constant_queries(view, lambda: add_results(exam, students[5:], admin))
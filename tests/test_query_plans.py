@@ -0,0 +1,13 @@
+"""
+Every hot query must be served by an index (the flask explain-queries check)
+"""
+
+from app.cli import hot_queries, explain
+
+def test_hot_queries_use_indexes(app):
+    scans = {}
+    for name, statement in hot_queries():
+        plan, full_scan = explain(statement)
+        if full_scan:
+            scans[name] = plan
+    assert not scans, scans